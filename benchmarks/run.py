@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""
+times and memory-profiles every stage of the scanner on synthetic specs, run from the
+repository root, e.g.
+
+    python -m benchmarks.run --cases small,medium --repeat 3 --output bench.json
+    python -m benchmarks.run --output new.json --compare bench.json
+
+everything runs offline on generated specs. results are written as json
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from benchmarks.synthetic import SyntheticSpec
+from parser.profiling import Profiler
+
+logger = logging.getLogger(__name__)
+
+# prance's validation dominates and grows quickly with the resolved size, keep the
+# default cases (small, medium) at a few hundred kB
+CASES = {
+    'small': dict(schemas=20, properties=5, depth=1, allof=2, arrays=1, refs=1, paths=10, operations=2),
+    'medium': dict(schemas=50, properties=6, depth=2, allof=5, arrays=1, refs=1, paths=25, operations=2),
+    'large': dict(schemas=300, properties=8, depth=2, allof=30, arrays=1, refs=2, paths=150, operations=3),
+    'deep': dict(schemas=20, properties=3, depth=12, allof=2, arrays=0, refs=1, paths=10, operations=2),
+    'wide': dict(schemas=20, properties=150, depth=1, allof=2, arrays=1, refs=2, paths=10, operations=2)
+}
+
+STAGES = ['preprocess', 'resolve', 'build', 'convert_objects', 'convert_links', 'merge', 'zip_metadata']
+
+def pipeline(spec_path, workdir, profiler):
+    """
+    one scan of spec_path the way main.execute does it, stage by stage (see Profiler.stage,
+    with tracemalloc running the peak memory of every stage is taken too). returns (objects,
+    links) rows
+    """
+    from main import merge_csv
+    from parser.openapi import OpenAPIParser, zip_metadata
+    from parser.preprocessing import Preprocessor
+
+    spec_json = os.path.basename(spec_path)
+    scratch = os.path.join(workdir, 'scratch')
+    os.makedirs(scratch)
+
+    with profiler.stage('preprocess'):
+        spec = Preprocessor(spec_path, scratch).fix()
+
+    with profiler.stage('resolve'):
+        parser = OpenAPIParser(spec_json, spec, scratch, stream=True, url=spec_path)
+
+    with profiler.stage('build'):
+        parser.build()
+
+    with profiler.stage('convert_objects'):
+        parser.convert_objects(False)
+
+    with profiler.stage('convert_links'):
+        parser.convert_links(False)
+
+    objectfile = os.path.join(workdir, f'objects-{spec_json}.csv')
+    linkfile = os.path.join(workdir, f'links-{spec_json}.csv')
+    os.rename(os.path.join(scratch, 'objects.csv'), objectfile)
+    os.rename(os.path.join(scratch, 'links.csv'), linkfile)
+
+    with profiler.stage('merge'):
+        merge_csv([objectfile], os.path.join(workdir, 'objects.csv'))
+        merge_csv([linkfile], os.path.join(workdir, 'links.csv'))
+
+    with profiler.stage('zip_metadata'):
+        zip_metadata(workdir)
+
+    return sum(1 for _ in parser.object_rows()), sum(1 for _ in parser.link_rows())
+
+def run_case(name, parameters, repeat, tmpdir):
+    import shutil
+    import statistics
+    import tracemalloc
+
+    casedir = os.path.join(tmpdir, name)
+    os.makedirs(casedir)
+    spec_path = os.path.join(casedir, f'{name}.json')
+    SyntheticSpec(**parameters).write(spec_path)
+
+    runs = []
+    for r in range(repeat):
+        workdir = os.path.join(casedir, f'run{r}')
+        os.makedirs(workdir)
+        profiler = Profiler(workdir)
+        objects, links = pipeline(spec_path, workdir, profiler)
+        runs.append(profiler.stages)
+        shutil.rmtree(workdir)
+
+    # memory in a separate run, tracemalloc slows everything down
+    workdir = os.path.join(casedir, 'memory')
+    os.makedirs(workdir)
+    profiler = Profiler(workdir)
+    tracemalloc.start()
+
+    try:
+        pipeline(spec_path, workdir, profiler)
+    finally:
+        tracemalloc.stop()
+
+    memory = profiler.stages
+    shutil.rmtree(workdir)
+
+    stages = {}
+    for stage in STAGES:
+        walls = [run[stage]['wall'] for run in runs]
+        cpus = [run[stage]['cpu'] for run in runs]
+        stages[stage] = {
+            'wall': walls,
+            'wall_min': min(walls),
+            'wall_median': statistics.median(walls),
+            'cpu_median': statistics.median(cpus),
+            'peak_bytes': memory[stage]['peak_bytes']
+        }
+
+    result = {
+        'parameters': parameters,
+        'spec_bytes': os.path.getsize(spec_path),
+        'objects': objects,
+        'links': links,
+        'stages': stages
+    }
+
+    logger.info(f'[INFO] {name}: ' + ', '.join(f'{stage} {stages[stage]["wall_median"]:.3f}s' for stage in STAGES))
+    return result
+
+def environment():
+    import platform
+    from parser.cache import ScanCache
+
+    return {
+        'scanner_version': ScanCache.scanner_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+def compare(results, baseline, threshold):
+    """ log the median wall time ratio of every stage, returns the list of regressions """
+    regressions = []
+
+    for case, result in results['cases'].items():
+        if case not in baseline['cases']:
+            continue
+
+        for stage, stats in result['stages'].items():
+            old = baseline['cases'][case]['stages'].get(stage)
+
+            if not old or not old['wall_median']:
+                continue
+
+            ratio = stats['wall_median'] / old['wall_median']
+            logger.info(f'[INFO] {case}/{stage}: {old["wall_median"]:.4f}s -> {stats["wall_median"]:.4f}s ({ratio:.2f}x)')
+
+            if ratio > threshold:
+                regressions.append({'case': case, 'stage': stage, 'ratio': ratio})
+
+    return regressions
+
+def _parse_args(argv):
+    parser = ArgumentParser()
+    parser.add_argument('--cases', default='small,medium', type=str, help='comma separated cases: ' + ','.join(CASES))
+    parser.add_argument('--repeat', default=3, type=int, help='timed runs per case')
+    parser.add_argument('--output', default='bench.json', type=str, help='json file to write the results to')
+    parser.add_argument('--compare', default=None, type=str, help='results of an earlier run to compare with')
+    parser.add_argument('--threshold', default=1.2, type=float, help='median wall time ratio counted as regression')
+    return parser.parse_args(argv[1:])
+
+def _main(argv):
+    import tempfile
+
+    args = _parse_args(argv)
+    results = {'environment': environment(), 'cases': {}}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for case in args.cases.split(','):
+            results['cases'][case] = run_case(case, CASES[case], args.repeat, tmpdir)
+
+    regressions = []
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        results['regressions'] = regressions
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f'[INFO] results written to {args.output}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S', level=logging.INFO)
+    # the scanner warns about every schema without properties and logs every merge
+    logging.getLogger('model').setLevel(logging.ERROR)
+    logging.getLogger('main').setLevel(logging.WARNING)
+    sys.exit(_main(sys.argv))
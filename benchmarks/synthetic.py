@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+generator for synthetic OpenAPI 3.0 specs, e.g.
+
+    python -m benchmarks.synthetic --schemas 200 --properties 20 --depth 3 --output big.json
+"""
+
+import json
+import random
+
+from argparse import ArgumentParser
+
+DATATYPES = [
+    {'type': 'string'},
+    {'type': 'string', 'format': 'date-time'},
+    {'type': 'integer', 'format': 'int64', 'example': 42},
+    {'type': 'number', 'format': 'double'},
+    {'type': 'boolean'},
+    {'type': 'array', 'items': {'type': 'string'}}
+]
+
+class SyntheticSpec():
+    """
+    builds a spec with tunable size. every schema gets its scalar properties, nested
+    objects down to depth, arrays of objects and $ref to one of the leaf schemas (the
+    first tenth, which have no $ref themselves), so there are no reference cycles and
+    resolving grows the spec linearly. allOf schemas extend random schemas.
+    the same parameters and seed always give the same spec
+    """
+    def __init__(self, schemas=50, properties=10, depth=2, allof=5, arrays=1, refs=1, paths=20, operations=2, seed=0):
+        self._schemas = schemas
+        self._properties = properties
+        self._depth = depth
+        self._allof = allof
+        self._arrays = arrays
+        self._refs = refs
+        self._paths = paths
+        self._operations = operations
+        self._random = random.Random(seed)
+
+    @property
+    def parameters(self):
+        return {
+            'schemas': self._schemas,
+            'properties': self._properties,
+            'depth': self._depth,
+            'allof': self._allof,
+            'arrays': self._arrays,
+            'refs': self._refs,
+            'paths': self._paths,
+            'operations': self._operations
+        }
+
+    def scalar(self, name):
+        value = dict(self._random.choice(DATATYPES))
+        value['description'] = f'{name} of the synthetic spec'
+        return value
+
+    def object(self, name, depth):
+        properties = {}
+
+        for p in range(self._properties):
+            properties[f'{name}_p{p}'] = self.scalar(f'{name}_p{p}')
+
+        if depth > 0:
+            properties[f'{name}_nested'] = self.object(f'{name}_nested', depth - 1)
+
+            for a in range(self._arrays):
+                properties[f'{name}_list{a}'] = {
+                    'type': 'array',
+                    'description': 'array of objects',
+                    'example': [{'id': a}],
+                    'items': self.object(f'{name}_item{a}', depth - 1)
+                }
+
+        return {'type': 'object', 'description': f'{name} object', 'properties': properties}
+
+    def schema(self, index):
+        name = f'Schema{index}'
+        value = self.object(name, self._depth)
+
+        leaves = max(1, self._schemas // 10)
+
+        for r in range(self._refs if index >= leaves else 0):
+            target = self._random.randrange(leaves)
+            value['properties'][f'{name}_ref{r}'] = {'$ref': f'#/components/schemas/Schema{target}'}
+
+        return name, value
+
+    def spec(self):
+        schemas = {}
+
+        for index in range(self._schemas):
+            name, value = self.schema(index)
+            schemas[name] = value
+
+        for index in range(min(self._allof, self._schemas)):
+            base = self._random.randrange(self._schemas)
+            schemas[f'Extended{index}'] = {
+                'allOf': [
+                    {'$ref': f'#/components/schemas/Schema{base}'},
+                    self.object(f'Extended{index}', 0)
+                ]
+            }
+
+        methods = ['get', 'post', 'put', 'delete', 'patch']
+        paths = {}
+
+        for index in range(self._paths):
+            pathitem = {}
+
+            for method in methods[0:self._operations]:
+                target = self._random.randrange(self._schemas) if self._schemas else None
+                operation = {'description': f'{method} resource{index}', 'responses': {'200': {'description': 'ok'}}}
+
+                if target is not None:
+                    content = {'application/json': {'schema': {'$ref': f'#/components/schemas/Schema{target}'}}}
+                    operation['responses']['200']['content'] = content
+
+                    if method in ('post', 'put', 'patch'):
+                        operation['requestBody'] = {'content': content}
+
+                pathitem[method] = operation
+
+            paths[f'/resource{index}'] = pathitem
+
+        return {
+            'openapi': '3.0.3',
+            'info': {
+                'title': 'synthetic spec',
+                'version': '1.0.0',
+                'description': 'generated by benchmarks.synthetic',
+                'contact': {'email': 'bench@example.com'},
+                'license': {'name': 'MIT'}
+            },
+            'externalDocs': {'url': 'https://example.com', 'description': 'synthetic'},
+            'paths': paths,
+            'components': {'schemas': schemas}
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.spec(), f)
+
+def _parse_args(argv):
+    parser = ArgumentParser()
+    parser.add_argument('--schemas', default=50, type=int, help='number of top level schemas')
+    parser.add_argument('--properties', default=10, type=int, help='scalar properties per object')
+    parser.add_argument('--depth', default=2, type=int, help='nesting depth of objects')
+    parser.add_argument('--allof', default=5, type=int, help='number of additional allOf schemas')
+    parser.add_argument('--arrays', default=1, type=int, help='arrays of objects per nested object')
+    parser.add_argument('--refs', default=1, type=int, help='$ref to leaf schemas per schema')
+    parser.add_argument('--paths', default=20, type=int, help='number of path items')
+    parser.add_argument('--operations', default=2, type=int, help='operations per path item (at most 5)')
+    parser.add_argument('--seed', default=0, type=int, help='random seed')
+    parser.add_argument('--output', default='synthetic.json', type=str, help='file to write the spec to')
+    return parser.parse_args(argv[1:])
+
+if __name__ == '__main__':
+    import sys
+    args = _parse_args(sys.argv)
+    SyntheticSpec(args.schemas, args.properties, args.depth, args.allof, args.arrays, args.refs, args.paths, args.operations, args.seed).write(args.output)
@@ -4,97 +4,281 @@ import sys
 import logging
 
 from argparse import ArgumentParser
-from parser.openapi import OpenAPIParser
+from parser.openapi import OpenAPIParser, zip_metadata
 from parser.preprocessing import Preprocessor
+from parser.profiling import Profiler
+from parser.validation import SpecValidator, VALIDATION_MODES
 
 logger = logging.getLogger(__name__)
 
-def execute(args):
+# specs submitted to the pool per worker and not handed on yet, see run_specs
+SPECS_IN_FLIGHT = 2
+
+def parse_spec(args, spec_json, dir, profiler=None):
+    """ preprocess and parse a spec, None on failure """
     import os
 
-    if not os.path.exists(args.output):
-        logger.exception('[EXCEPTION] Output is not given or not exist')
-        return
-    
-    object_files = []
-    link_files = []
+    spec_path = os.path.join(args.input, spec_json)
+
+    try:
+        processor = Preprocessor(spec_path, dir, profiler=profiler)
+
+        if args.stream_input:
+            spec = processor.stream()
+        else:
+            # references kept as references can't loop, no need to break them up front
+            spec = processor.fix(not args.lazy_refs)
+
+        validator = SpecValidator.from_args(args)
+        # the spec file is hashed, not the (maybe huge) parsed spec
+        digest = None if args.stream_input else validator.digest(spec_path)
+
+        return OpenAPIParser(
+            spec_json, spec, dir, args.debug,
+            stream=args.stream,
+            lazy_refs=args.lazy_refs,
+            url=spec_path,
+            profiler=profiler,
+            max_depth=args.max_depth,
+            max_nodes=args.max_nodes,
+            validator=validator,
+            dedup_schemas=args.dedup_schemas,
+            spec_workers=args.spec_workers,
+            spec_batch=args.spec_batch,
+            digest=digest
+        )
+    except Exception as ex:
+        logger.exception(f'[EXCEPTION] Failure {ex}')
+        return None
+
+def spec_cache(args, spec_json):
+    """ the ScanCache and key of a spec, (None, None) without --cache or with --debug """
+    import os
 
+    if not args.cache:
+        return None, None
+
+    if args.debug:
+        # a cached spec is not parsed, its processed_ file would be missing
+        logger.info(f'[INFO] {spec_json} not cached in debug mode')
+        return None, None
+
+    from parser.cache import ScanCache
+    cache = ScanCache(args.cache)
+    key = cache.key(os.path.join(args.input, spec_json), spec_json, (args.lazy_refs, args.stream, args.stream_input, args.max_depth, args.max_nodes, args.validation, args.validation_backend, args.dedup_schemas))
+
+    if key is None:
+        logger.info(f'[INFO] {spec_json} refers to remote documents, not cached')
+        return None, None
+
+    return cache, key
+
+def process_spec(args, spec_json, profiler=None):
+    """
+    scan a single spec in its own scratch dir below args.output, so that several specs can be
+    processed side by side. returns the renamed (objects, links) files or None on failure
+    """
+    import os
     import shutil
+    import tempfile
+    from parser.discovery import flat
 
-    for root, dirs, files in os.walk(args.output):
-        for f in files:
-            os.unlink(os.path.join(root, f))
-            for d in dirs:
-                shutil.rmtree(os.path.join(root, d))
-    
-    for file in os.listdir(args.input):
+    logger.info(f'[INFO] About to process {spec_json}')
 
-        if not os.path.isfile(os.path.join(args.input, file)):
-            continue
+    # specs found below subdirectories of args.input (--recursive) are written side by side
+    objectfile_renamed = os.path.join(args.output, f'objects-{flat(spec_json)}.csv')
+    linkfile_renamed = os.path.join(args.output, f'links-{flat(spec_json)}.csv')
+    cache, cache_key = spec_cache(args, spec_json)
 
-        spec_json = os.fsdecode(file)
-    
-        if spec_json.endswith(".json"):
-            logger.info(f'[INFO] About to process {spec_json}')
-            processor = Preprocessor(os.path.join(args.input, spec_json), args.output)
-            parser = OpenAPIParser(spec_json, processor.fix(), args.output, args.debug)
+    if cache and cache.get(cache_key, objectfile_renamed, linkfile_renamed):
+        logger.info(f'[INFO] {spec_json} unchanged, {objectfile_renamed} and {linkfile_renamed} taken from cache')
+        profiler and profiler.count(cached=1)
+        return objectfile_renamed, linkfile_renamed
+
+    scratch = tempfile.mkdtemp(prefix='.scan-', dir=args.output)
+
+    try:
+        parser = parse_spec(args, spec_json, scratch, profiler)
 
+        if not parser:
+            return None
+
+        if args.stream:
+            try:
+                parser.convert(False)
+            except Exception as ex:
+                logger.exception(f'[EXCEPTION] Failure {ex}')
+                return None
+        else:
             try:
                 parser.convert_objects(False)
             except Exception as ex:
                 logger.exception(f'[EXCEPTION] Failure {ex}')
-                continue
+                return None
 
             try:
                 parser.convert_links(False)
             except Exception as ex:
                 logger.exception(f'[EXCEPTION] Failure {ex}')
-                continue
+                return None
 
-            objectfile_renamed = os.path.join(args.output, f'objects-{spec_json}.csv')
-            linkfile_renamed = os.path.join(args.output, f'links-{spec_json}.csv')
+        os.rename(os.path.join(scratch, 'objects.csv'), objectfile_renamed)
+        os.rename(os.path.join(scratch, 'links.csv'), linkfile_renamed)
 
-            os.rename(os.path.join(args.output, 'objects.csv'), objectfile_renamed)
-            os.rename(os.path.join(args.output, 'links.csv'), linkfile_renamed)
-            object_files.append(objectfile_renamed)
-            link_files.append(linkfile_renamed)
+        # e.g. the processed spec written in debug mode
+        for f in os.listdir(scratch):
+            os.rename(os.path.join(scratch, f), os.path.join(args.output, f))
 
-            logger.info(f'[INFO] {objectfile_renamed} and {linkfile_renamed} created')
-    
-    '''
-    merge object files
-    TODO: robustness 1) header check 2) column matching 3) consider to use pandas
-    '''
-    object_files_merged = open(os.path.join(args.output, 'objects.csv'), 'a')
-    header = ''
-    header_set = False
+        if cache:
+            cache.put(cache_key, objectfile_renamed, linkfile_renamed)
 
-    for object_file in object_files:
-        csv_in = open(object_file)
-        for line in csv_in:
-            if not header_set:
-                header = line
-                header_set = True
-            else:
-                if line.startswith(header):
-                    continue
-            object_files_merged.write(line)
-    
-        csv_in.close()
-        logger.info(f'[... MERGED {object_file} ...]')
+        logger.info(f'[INFO] {objectfile_renamed} and {linkfile_renamed} created')
+        return objectfile_renamed, linkfile_renamed
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def collect_spec(args, spec_json, profiler=None):
+    """
+    scan a single spec into a RowBuffer for --direct-zip, None on failure. rows are only
+    handed on once the whole spec succeeded, so a failing spec leaves no partial rows
+    """
+    import os
+    import shutil
+    import tempfile
+    from parser.output import RowBuffer
+
+    logger.info(f'[INFO] About to process {spec_json}')
+    cache, cache_key = spec_cache(args, spec_json)
+    scratch = tempfile.mkdtemp(prefix='.scan-', dir=args.output)
+
+    try:
+        objectfile = os.path.join(scratch, 'objects.csv')
+        linkfile = os.path.join(scratch, 'links.csv')
+
+        if cache and cache.get(cache_key, objectfile, linkfile):
+            logger.info(f'[INFO] {spec_json} unchanged, taken from cache')
+            profiler and profiler.count(cached=1)
+            return RowBuffer.load(objectfile, linkfile)
+
+        parser = parse_spec(args, spec_json, scratch, profiler)
 
-    object_files_merged.close()
+        if not parser:
+            return None
+
+        rows = RowBuffer()
+
+        try:
+            parser.write(rows)
+        except Exception as ex:
+            logger.exception(f'[EXCEPTION] Failure {ex}')
+            return None
+
+        if cache:
+            rows.save(objectfile, linkfile)
+            cache.put(cache_key, objectfile, linkfile)
+            os.unlink(objectfile)
+            os.unlink(linkfile)
+
+        # e.g. the processed spec written in debug mode
+        for f in os.listdir(scratch):
+            os.rename(os.path.join(scratch, f), os.path.join(args.output, f))
+
+        return rows
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def profile_spec(func, args, spec_json):
+    """ func(args, spec_json, profiler) with the spec profiled when --profile is given """
+    profiler = Profiler.from_args(args, spec_json)
+    profiler.start()
+
+    try:
+        return func(args, spec_json, profiler)
+    finally:
+        profiler.stop()
+
+def run_specs(args, func, spec_jsons):
+    """
+    yield (spec_json, func(args, spec_json)) for every spec in the order of spec_jsons, computed
+    by args.workers processes. spec_jsons may be an iterator of specs still arriving (e.g. being
+    downloaded), each spec is started as soon as it arrives. at most SPECS_IN_FLIGHT times
+    args.workers specs are submitted and not yielded yet, the next ones are submitted as results
+    are handed on, so the results held at once (e.g. the RowBuffer of every spec) stay bounded.
+    a spec failing in its worker yields None
+    """
+    if args.workers <= 1:
+        for spec_json in spec_jsons:
+            yield spec_json, profile_spec(func, args, spec_json)
+        return
 
+    import tempfile
+    from argparse import Namespace
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with tempfile.TemporaryDirectory(prefix='.refs-', dir=args.output) as refs, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # external $ref documents parsed by one worker are picked up by the others, see ReferenceCache
+        args = Namespace(**vars(args), reference_dir=refs)
+        spec_jsons = iter(spec_jsons)
+        futures = deque()
+
+        while True:
+            for spec_json in spec_jsons:
+                futures.append((spec_json, pool.submit(profile_spec, func, args, spec_json)))
+
+                if len(futures) >= SPECS_IN_FLIGHT * args.workers:
+                    break
+
+            if not futures:
+                break
+
+            spec_json, future = futures.popleft()
+
+            try:
+                result = future.result()
+            except Exception as ex:
+                logger.exception(f'[EXCEPTION] Failure in worker for {spec_json}: {ex}')
+                result = None
+
+            yield spec_json, result
+
+def in_order(results, order):
+    """
+    yield the (spec_json, result) pairs of results in the order of order, each as soon as all
+    specs before it are done. specs that never arrive are skipped at the end
+    """
+    pending = {}
+    order = iter(order)
+    spec_json = None
+    started = False
+
+    for result in results:
+        pending[result[0]] = result[1]
+
+        if not started:
+            # only asked once the first result is in, the order of a SpecDiscovery is known when its walk is done
+            spec_json = next(order, None)
+            started = True
+
+        while spec_json in pending:
+            yield spec_json, pending.pop(spec_json)
+            spec_json = next(order, None)
+
+    for spec_json in [spec_json, *order] if started else order:
+        if spec_json in pending:
+            yield spec_json, pending.pop(spec_json)
+
+def merge_csv(files, merged):
     '''
-    merge link files
+    append the csv files to merged, with the header of the first file only
     TODO: robustness 1) header check 2) column matching 3) consider to use pandas
     '''
-    object_links_merged = open(os.path.join(args.output, 'links.csv'), 'a')
+    files_merged = open(merged, 'a')
     header = ''
     header_set = False
 
-    for link_file in link_files:
-        csv_in = open(link_file)
+    for file in files:
+        csv_in = open(file)
         for line in csv_in:
             if not header_set:
                 header = line
@@ -102,20 +286,350 @@ def execute(args):
             else:
                 if line.startswith(header):
                     continue
-            object_links_merged.write(line)
+            files_merged.write(line)
     
         csv_in.close()
-        logger.info(f'[... MERGED {link_file} ...]')
+        logger.info(f'[... MERGED {file} ...]')
+
+    files_merged.close()
+
+def sharded(args):
+    return args.shard_rows is not None or args.shard_bytes is not None
+
+def merged_writer(args, path=None):
+    """ writer of the merged rows for --direct-zip: metadata.zip (or path), or shards with --shard-rows/--shard-bytes """
+    import os
+    from model.model import OpenAPIModel
+    from parser.output import MetadataZip, ShardedOutput
+
+    level = 6 if args.zip_level is None else args.zip_level
+
+    if sharded(args):
+        return ShardedOutput(args.output, args.shard_rows, args.shard_bytes, level, args.shard_writers, OpenAPIModel().link_csv_header.keys())
+
+    return MetadataZip(path or os.path.join(args.output, 'metadata.zip'), level)
+
+def write_merged(args, spec_jsons, results):
+    """ regenerate the merged output from the rows of every spec (see collect_spec), in the order of spec_jsons """
+    import os
+    from parser.output import MetadataCSV
+
+    if sharded(args):
+        with merged_writer(args) as shards:
+            for spec_json in spec_jsons:
+                if results.get(spec_json):
+                    results[spec_json].replay(shards)
+        return
+
+    if args.direct_zip:
+        path = os.path.join(args.output, 'metadata.zip')
+
+        with merged_writer(args, path + '.tmp') as metadata:
+            for spec_json in spec_jsons:
+                if results.get(spec_json):
+                    results[spec_json].replay(metadata)
+
+        os.replace(path + '.tmp', path)
+        return
+
+    with MetadataCSV(args.output) as merged:
+        for spec_json in spec_jsons:
+            if results.get(spec_json):
+                results[spec_json].replay(merged)
+
+    zip_metadata(args.output, args.zip_level)
+
+def render(args, store):
+    """ write the merged output of the specs of the MetadataStore, in its order """
+    from parser.output import MetadataCSV
+
+    if args.direct_zip or sharded(args):
+        with merged_writer(args) as metadata:
+            store.render(metadata, args.dedup)
+        return
+
+    with MetadataCSV(args.output) as merged:
+        store.render(merged, args.dedup)
+
+    zip_metadata(args.output, args.zip_level)
+
+def store_spec(store, spec_json, rows):
+    """ keep the rows of a scanned spec in the store, a failed spec is dropped like it is from the output """
+    if rows:
+        store.put(spec_json, rows)
+    else:
+        store.delete(spec_json)
+
+def open_store(args):
+    """ the MetadataStore of --store, None without """
+    if not args.store:
+        return None
+
+    from parser.store import MetadataStore
+    return MetadataStore(args.store)
+
+def export_delta(args, profiler=None):
+    """ with --delta, write delta.zip with the rows changed since the previous scan, see parser.delta """
+    import os
+
+    if not args.delta:
+        return
+
+    from parser.delta import DeltaExport
+
+    with (profiler or Profiler()).stage('delta'), DeltaExport(args.delta, os.path.join(args.output, 'delta.zip')) as delta:
+        delta.diff_output(args.output)
+
+    logger.info(f'[INFO] {os.path.join(args.output, "delta.zip")} created')
+
+def watch(args):
+    """
+    scan args.input and keep the rows of every spec in memory, then re-scan only added or
+    changed specs whenever the directory changes and write the merged output again. runs
+    until interrupted
+    """
+    import time
+    from parser.discovery import SpecDiscovery
+    from parser.watch import DirectoryWatcher
+
+    watcher = DirectoryWatcher(args.input, args.poll_interval, SpecDiscovery.from_args(args))
+    store = open_store(args)
+    results = {}
+    first = True
+
+    try:
+        while True:
+            changed, removed = watcher.changes()
+
+            if changed or removed or first:
+                start = time.perf_counter()
+
+                for spec_json in removed:
+                    results.pop(spec_json, None)
+                    logger.info(f'[INFO] {spec_json} removed')
+
+                for spec_json, rows in run_specs(args, collect_spec, changed):
+                    if store:
+                        # the rows live in the store only
+                        store_spec(store, spec_json, rows)
+                    else:
+                        results[spec_json] = rows
+
+                if store:
+                    store.sync(watcher.files)
+                    render(args, store)
+                else:
+                    write_merged(args, watcher.files, results)
+
+                export_delta(args)
+                logger.info(f'[INFO] {len(changed)} specs scanned, {len(removed)} removed, merged output of {len(watcher.files)} specs written in {time.perf_counter() - start:.2f}s')
+                first = False
+
+            watcher.wait()
+    except KeyboardInterrupt:
+        logger.info('[INFO] watch stopped')
+    finally:
+        watcher.close()
+
+        if store:
+            store.close()
+
+def execute(args):
+    import os
+
+    if not os.path.exists(args.output):
+        logger.exception('[EXCEPTION] Output is not given or not exist')
+        return
+
+    if (args.from_store or args.dedup) and not args.store:
+        logger.exception('[EXCEPTION] --from-store and --dedup need --store')
+        return
+
+    import shutil
+
+    if args.stream_input and not (args.lazy_refs and args.stream):
+        # a streamed spec is only bounded in memory while nothing holds on to its components
+        logger.info('[INFO] --stream-input implies --lazy-refs and --stream')
+        args.lazy_refs = True
+        args.stream = True
+
+    profiler = Profiler.from_args(args)
+
+    if profiler.enabled and os.path.exists(os.path.join(args.profile, 'specs')):
+        # only report the specs of this run
+        shutil.rmtree(os.path.join(args.profile, 'specs'))
+
+    for root, dirs, files in os.walk(args.output):
+        for f in files:
+            os.unlink(os.path.join(root, f))
+            for d in dirs:
+                shutil.rmtree(os.path.join(root, d))
+
+    if args.watch:
+        if args.urls:
+            logger.warning('[WARNING] --watch only watches --input, --urls is ignored')
+
+        watch(args)
+        return
+
+    # the run level stages (discover, scan, merge, ...) report their memory too with --profile-memory
+    profiler.start()
+
+    if args.from_store:
+        with profiler.stage('render'), open_store(args) as store:
+            logger.info(f'[INFO] rendering {len(store.specs())} specs of {args.store}')
+            render(args, store)
+    else:
+        scan(args, profiler)
+
+    export_delta(args, profiler)
+    write_profile(profiler)
+
+def scan(args, profiler):
+    """ scan the specs of args.input (or args.urls) into the merged output, through the store with args.store """
+    import os
+
+    fetcher = None
+
+    with profiler.stage('discover'):
+        if args.urls:
+            from parser.fetch import SpecFetcher, read_urls
+
+            # specs are downloaded into args.input and scanned while the others are still on their way
+            os.makedirs(args.input, exist_ok=True)
+            urls = read_urls(args.urls)
+            fetcher = SpecFetcher(args.input, args.fetch_workers)
+            order = list(SpecFetcher.names(urls).values())
+            spec_jsons = fetcher.fetch_all(urls)
+        else:
+            from parser.discovery import SpecDiscovery
+
+            # specs are scanned as they are found, the walk of args.input goes on in the background
+            discovery = SpecDiscovery.from_args(args)
+            order = discovery
+            spec_jsons = discovery.files()
+
+    if args.store:
+        # rows go through the store, the output is rendered from it once all specs are in
+        with open_store(args) as store:
+            with profiler.stage('scan_store'):
+                for spec_json, rows in run_specs(args, collect_spec, spec_jsons):
+                    store_spec(store, spec_json, rows)
+                    logger.info(f'[... STORED {spec_json} ...]')
+
+                store.sync(order)
+
+            with profiler.stage('render'):
+                render(args, store)
+
+            counts = store.counts()
+            logger.info(f'[INFO] {counts["objects"]} objects and {counts["links"]} links of {counts["specs"]} specs in {args.store}')
+    elif args.direct_zip or sharded(args):
+        with profiler.stage('scan_zip'), merged_writer(args) as metadata:
+            for spec_json, rows in in_order(run_specs(args, collect_spec, spec_jsons), order):
+                if rows:
+                    rows.replay(metadata)
+                    logger.info(f'[... ZIPPED {spec_json} ...]')
+    else:
+        object_files = []
+        link_files = []
+
+        # results are gathered in the (sorted) order of the spec files or the url list, not in order of completion
+        with profiler.stage('scan'):
+            for spec_json, result in in_order(run_specs(args, process_spec, spec_jsons), order):
+                if result:
+                    object_files.append(result[0])
+                    link_files.append(result[1])
+
+        with profiler.stage('merge'):
+            merge_csv(object_files, os.path.join(args.output, 'objects.csv'))
+            merge_csv(link_files, os.path.join(args.output, 'links.csv'))
+
+        with profiler.stage('zip_metadata'):
+            zip_metadata(args.output, args.zip_level)
+
+    profiler.count(specs=len(order))
+    fetched(fetcher, profiler)
+
+def fetched(fetcher, profiler):
+    """ log and count the downloads of --urls """
+    if not fetcher:
+        return
+
+    fetcher.close()
+    stats = fetcher.stats
+    logger.info(f'[INFO] {stats["downloaded"]} specs downloaded, {stats["not_modified"]} not modified, {stats["failed"]} failed')
+    profiler.count(**stats)
+
+def write_profile(profiler):
+    """ save the run next to the specs and write the report, see Profiler.write_report """
+    if not profiler.enabled:
+        return
+
+    profiler.stop()
+    profiler.write_report()
+
+def size(value):
+    """ a number of bytes, optionally with K, M or G """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    value = value.strip().upper()
+
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+
+    return int(value)
+
+def positive(value):
+    """ an int of at least 1 """
+    from argparse import ArgumentTypeError
+
+    number = int(value)
 
-    object_links_merged.close()
+    if number < 1:
+        raise ArgumentTypeError(f'{value} is not at least 1')
 
-    parser.zip_metadata()
+    return number
 
 def _parse_args(argv):
     parser = ArgumentParser()
-    parser.add_argument('--input', default=None, type=str, help='directory where openapi spec json files are stored')
+    parser.add_argument('--input', default=None, type=str, help='directory where openapi spec json files are stored (with --urls: downloaded to)')
+    parser.add_argument('--urls', default=None, type=str, help='file with one spec url per line, downloaded into --input (only if changed) and scanned')
+    parser.add_argument('--recursive', default=False, action='store_true', help='also find spec files in the subdirectories of --input, scanned while the others are still looked for')
+    parser.add_argument('--include', default=None, action='append', help='glob of the spec files to scan, matched against the path below --input or the file name (repeatable, *.json by default)')
+    parser.add_argument('--exclude', default=None, action='append', help='glob of files and directories below --input to skip, matched like --include (repeatable)')
+    parser.add_argument('--follow-symlinks', default=False, action='store_true', help='with --recursive, enter symlinked directories (each directory once)')
+    parser.add_argument('--discovery-workers', default=8, type=int, help='directories scanned at the same time with --recursive')
+    parser.add_argument('--fetch-workers', default=8, type=int, help='specs downloaded at the same time with --urls')
     parser.add_argument('--output', default=None, type=str, help='directory to save objects.csv and links.csv')
     parser.add_argument('--debug', default=False, type=bool, help='debug option. for example create additional spec validation file')
+    parser.add_argument('--stream', default=False, action='store_true', help='write rows while the model is walked instead of building the whole model first')
+    parser.add_argument('--stream-input', default=False, action='store_true', help='index huge spec files instead of loading them, components are read one at a time (no validation, implies --lazy-refs and --stream)')
+    parser.add_argument('--lazy-refs', default=False, action='store_true', help='keep $ref as links to the referenced schema instead of inlining every reference, $ref into other documents are not followed')
+    parser.add_argument('--validation', default='strict', choices=VALIDATION_MODES, help='strict: invalid specs are not scanned, parallel: the same while the model is built, lenient: invalid specs are only logged, skip: no validation')
+    parser.add_argument('--validation-backend', default=None, choices=['flex', 'swagger-spec-validator', 'openapi-spec-validator'], help='prance validation backend, the first one installed by default')
+    parser.add_argument('--validation-cache', default=None, type=str, help='directory (outside of --output) to keep validation outcomes by spec content, valid specs are not validated again')
+    parser.add_argument('--ref-cache-size', default=128, type=int, help='external $ref documents kept parsed for all specs of a worker, 0 to parse them again for every spec')
+    parser.add_argument('--cache', default=None, type=str, help='directory (outside of --output) to reuse the results of unchanged spec files across runs, not used with --debug')
+    parser.add_argument('--store', default=None, type=str, help='sqlite file (outside of --output) keeping the rows of every spec, the merged output is rendered from it')
+    parser.add_argument('--from-store', default=False, action='store_true', help='with --store, only render the merged output of the stored specs again, nothing is scanned')
+    parser.add_argument('--dedup', default=False, action='store_true', help='with --store, keep only the first object of every identity and the first of equal links')
+    parser.add_argument('--delta', default=None, type=str, help='sqlite file (outside of --output) with the row fingerprints of the previous scan, the rows changed since are written to delta.zip')
+    parser.add_argument('--direct-zip', default=False, action='store_true', help='write the merged rows straight into a deflated metadata.zip, without csv files')
+    parser.add_argument('--zip-level', default=None, type=int, choices=range(0, 10), help='deflate level of metadata.zip. without it metadata.zip is stored uncompressed (6 with --direct-zip)')
+    parser.add_argument('--max-depth', default=None, type=int, help='keep schemas nested deeper than this without their children')
+    parser.add_argument('--max-nodes', default=None, type=int, help='at most this many schemas and properties per top level schema')
+    parser.add_argument('--dedup-schemas', default=False, action='store_true', help='link a schema with the same value as one before in its spec to that one, instead of writing its properties and sub schemas again')
+    parser.add_argument('--shard-rows', default=None, type=positive, help='split the output into metadata-NNNN.zip shards of at most this many rows, described by manifest.json')
+    parser.add_argument('--shard-bytes', default=None, type=size, help='split the output into shards of about this much csv, e.g. 500M')
+    parser.add_argument('--shard-writers', default=2, type=positive, help='shards compressed and written at the same time')
+    parser.add_argument('--workers', default=1, type=int, help='number of processes scanning spec files in parallel')
+    parser.add_argument('--spec-workers', default=1, type=int, help='processes walking the top level schemas and path items of one spec in batches, per --workers process')
+    parser.add_argument('--spec-batch', default=None, type=int, help='top level schemas (or path items) per batch of --spec-workers, 500 by default')
+    parser.add_argument('--watch', default=False, action='store_true', help='keep running, re-scan added or changed spec files and rewrite the merged output')
+    parser.add_argument('--poll-interval', default=2.0, type=float, help='seconds between checks of --input with --watch where inotify is not available')
+    parser.add_argument('--profile', default=None, type=str, help='directory (outside of --output) to write per stage timings and row counts to, as profile.json')
+    parser.add_argument('--profile-memory', default=False, action='store_true', help='with --profile, trace peak memory per stage and dump a tracemalloc snapshot per spec and of the run')
+    parser.add_argument('--profile-cprofile', default=False, action='store_true', help='with --profile, dump cProfile stats per spec')
     parser.set_defaults(func=execute)
 
     args = parser.parse_args(argv[1:])
@@ -0,0 +1,90 @@
+from array import array
+
+class AssociationStore():
+    """
+    links of a model, grouped by association name in insertion order.
+
+    identities are interned to integer ids, and every association keeps its edges in two
+    compact arrays of ids, so the long identity strings are held once no matter how many
+    links use them. ids are decoded to identities when the links are read.
+
+    duplicate edges are dropped when the links are read, the first one is kept (see unique()).
+    a set of the edges seen would cost about as much per edge as the tuples the arrays replace,
+    for a duplicate that a walk hardly produces
+    """
+    def __init__(self, associationnames=()):
+        self._ids = {}
+        self._identities = []
+        self._edges = {}
+
+        for associationname in associationnames:
+            self._register(associationname)
+
+    def _register(self, associationname):
+        # from ids and to ids
+        edges = (array('I'), array('I'))
+        self._edges[associationname] = edges
+        return edges
+
+    def intern(self, identity):
+        id = self._ids.get(identity)
+
+        if id is None:
+            id = len(self._identities)
+            self._ids[identity] = id
+            self._identities.append(identity)
+
+        return id
+
+    def identity(self, id):
+        return self._identities[id]
+
+    def add(self, associationname, fromidentity, toidentity):
+        """ store an edge """
+        edges = self._edges.get(associationname)
+
+        if edges is None:
+            edges = self._register(associationname)
+
+        edges[0].append(self.intern(fromidentity))
+        edges[1].append(self.intern(toidentity))
+
+    def names(self):
+        return self._edges.keys()
+
+    @staticmethod
+    def unique(fromids, toids):
+        """
+        bytearray flagging the edges stored before (1) by index. the edges are sorted once by
+        (from, to, index) packed into one int, a duplicate follows the first one of its edge
+        """
+        duplicates = bytearray(len(fromids))
+        previous = None
+
+        for key in sorted(fromid << 64 | toid << 32 | index for index, (fromid, toid) in enumerate(zip(fromids, toids))):
+            if key >> 32 == previous:
+                duplicates[key & 0xFFFFFFFF] = 1
+
+            previous = key >> 32
+
+        return duplicates
+
+    def edges(self, associationname):
+        """ (fromObjectIdentity, toObjectIdentity) of an association in insertion order, without duplicates """
+        fromids, toids = self._edges[associationname]
+        duplicates = self.unique(fromids, toids)
+        identities = self._identities
+
+        for fromid, toid, duplicate in zip(fromids, toids, duplicates):
+            if not duplicate:
+                yield identities[fromid], identities[toid]
+
+    def rows(self):
+        """ (association, fromObjectIdentity, toObjectIdentity) of all links """
+        for associationname in self._edges:
+            for fromidentity, toidentity in self.edges(associationname):
+                yield associationname, fromidentity, toidentity
+
+    def __len__(self):
+        """ the edges stored, duplicates included """
+        return sum(len(edges[0]) for edges in self._edges.values())
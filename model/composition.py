@@ -0,0 +1,135 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from model.references import ReferenceIndex
+
+# combinators composed into the properties of a schema, alternatives add what the ones before did not have
+ALTERNATIVES = ('oneOf', 'anyOf')
+
+# keys of a schema value that take more than its own properties
+COMPOSITION_KEYS = frozenset(('allOf',) + ALTERNATIVES + ('discriminator',))
+
+class Composer():
+    """
+    the properties of schema values with allOf, oneOf and anyOf, as {name: (value, location)}.
+
+    allOf blocks are merged in order (a later block overrides a property), then the own
+    properties of the schema, then the ones of the oneOf and anyOf alternatives not defined
+    yet. blocks are composed themselves, so nested compositions are followed. the property
+    named by a discriminator is added if no block defines it.
+
+    location is the json pointer of the property relative to the schema value ('/allOf/0/
+    properties/id'), also where a block was a $ref (lazy_refs), and None where unknown.
+    a composed map is kept by the identity of its value, the resolved specs of prance share
+    the objects of a $ref, so a schema is composed once per spec however often it appears.
+    a map composed while a cycle was cut at a value still being composed lacks what that
+    value adds, it is not kept and is composed again where it is needed next
+    """
+    def __init__(self, lazy_refs=False):
+        self._lazy_refs = lazy_refs
+        # id -> (value, properties), the value keeps its id from being reused
+        self._memo = {}
+        # ids of the values being composed, to stop at a composition containing itself
+        self._pending = set()
+        # ids of the pending values a cycle was cut at, the maps composed meanwhile are incomplete
+        self._cut = set()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def clear(self):
+        self._memo = {}
+
+    def properties(self, schema):
+        """ {name: (value, location)} of schema, locations resolved against the one of schema """
+        value = schema.schemavalue
+        base = schema.location
+
+        if COMPOSITION_KEYS.isdisjoint(value):
+            # nothing to compose (the most schemas): the own properties
+            own = value.get('properties')
+
+            if not isinstance(own, dict):
+                return {}
+
+            return {name: (property, base and base + '/properties/' + ReferenceIndex.escape(name)) for name, property in own.items()}
+
+        return {name: (property, self.join(base, location)) for name, (property, location) in self.compose(value, schema).items()}
+
+    def compose(self, value, schema):
+        """ {name: (value, relative location)} of value, $ref of its blocks followed in the spec of schema """
+        if id(value) in self._memo:
+            self._stats['hits'] += 1
+            return self._memo[id(value)][1]
+
+        if id(value) in self._pending:
+            logger.warning(f'[WARNING] composition cycle detected in {schema.path}')
+            self._cut.add(id(value))
+            return {}
+
+        self._stats['misses'] += 1
+        self._pending.add(id(value))
+
+        try:
+            properties = {}
+
+            for block, location in self.blocks(value, 'allOf', schema):
+                properties.update(self.nested(block, location, schema))
+
+            own = value.get('properties')
+
+            if isinstance(own, dict):
+                properties.update((name, (property, '/properties/' + ReferenceIndex.escape(name))) for name, property in own.items())
+
+            for combinator in ALTERNATIVES:
+                for block, location in self.blocks(value, combinator, schema):
+                    for name, property in self.nested(block, location, schema).items():
+                        properties.setdefault(name, property)
+
+            discriminator = value.get('discriminator')
+
+            if isinstance(discriminator, dict) and isinstance(discriminator.get('propertyName'), str):
+                properties.setdefault(discriminator['propertyName'], ({'type': 'string'}, None))
+        finally:
+            self._pending.discard(id(value))
+            self._cut.discard(id(value))
+
+        if not self._cut:
+            self._memo[id(value)] = (value, properties)
+
+        return properties
+
+    def blocks(self, value, combinator, schema):
+        """ (block value, location) of the blocks of combinator, followed where they are a $ref """
+        blocks = value.get(combinator)
+
+        if not isinstance(blocks, list):
+            return
+
+        for index, block in enumerate(blocks):
+            location = '/' + combinator + '/' + str(index)
+
+            if self._lazy_refs:
+                # the properties of a $ref block are located below the composing schema, as
+                # once prance resolved it, not at the referenced schema which indexes its own
+                ref, block = schema.dereference(block)
+
+                if block is None and ref and not ref.startswith('#'):
+                    logger.warning(f'[WARNING] {ref} of {schema.path} is in another document, its properties are not composed')
+
+            if isinstance(block, dict):
+                yield block, location
+
+    def nested(self, block, location, schema):
+        """ the composed properties of a block at location """
+        return {name: (property, self.join(location, nested)) for name, (property, nested) in self.compose(block, schema).items()}
+
+    @staticmethod
+    def join(base, location):
+        """ location (relative to a value at base) as seen from where base is relative to """
+        if location is None or base is None:
+            return None
+
+        return base + location
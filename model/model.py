@@ -1,12 +1,31 @@
-import copy
 import json
 import logging
+import re
 logger = logging.getLogger(__name__)
 
+from model.associations import AssociationStore
+from model.references import ReferenceIndex
+from model.composition import Composer
+from model.subtrees import Fingerprints, Subtree
+
+# keys of a path item that are operations
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
 class OpenAPIModel():
-    def __init__(self):
+    def __init__(self, lazy_refs=False, max_depth=None, max_nodes=None, dedup_schemas=False):
         """
         see model/model.xml
+
+        lazy_refs: the spec still contains its $ref. a schema referencing a component is
+        linked to it instead of walking a copy of it
+
+        max_depth: schemas nested that deep below a top level schema are kept without their
+        children. max_nodes: at most that many schemas and properties per top level schema.
+        truncated schemas are reported in truncated, None means no limit
+
+        dedup_schemas: a schema with the same value (see Fingerprints) as one walked before in
+        the spec gets no children of its own, it is linked (schemaschema) to the first one. not
+        used with max_depth or max_nodes, what is cut there depends on where a schema is
         """
 
         self._objects_head = {}
@@ -31,6 +50,16 @@ class OpenAPIModel():
         self._association_datasetdataflow = 'core.DataSetDataFlow'
         self._association_directionaldataflow = 'core.DirectionalDataFlow'
 
+        self._lazy_refs = lazy_refs
+        self._max_depth = max_depth
+        self._max_nodes = max_nodes
+        self._dedup_schemas = dedup_schemas and max_depth is None and max_nodes is None
+        # fingerprints of the schema values of the spec, and the Subtree of the first schema walked per fingerprint
+        self._fingerprints = Fingerprints()
+        self._canonical = {}
+        # composed properties of the schema values of the spec
+        self._composer = Composer(lazy_refs)
+        self._truncated = []
         self._spec = None
         self._endpoint = None
         self._info = None
@@ -39,20 +68,35 @@ class OpenAPIModel():
         self._properties = []
         self._paths = []
         self._operations = []
-
-        self._associations = {
-            self._association_resourceparanchild: [],
-            self._association_endpointinfo: [],
-            self._association_enndpointschema: [],
-            self._association_schemaproperty: [],
-            self._association_schemaschema: [],
-            self._association_endpointpathitem: [],
-            self._association_pathitemoperation: []
+        # lists of the objects walked elsewhere by class, Rendered duck types their row()
+        self._rendered = {
+            Schema._classname: self._schemas,
+            SchemaProperty._classname: self._properties,
+            PathItem._classname: self._paths,
+            Operation._classname: self._operations
         }
+
+        self._associations = AssociationStore([
+            self._association_resourceparanchild,
+            self._association_endpointinfo,
+            self._association_enndpointschema,
+            self._association_schemaproperty,
+            self._association_schemaschema,
+            self._association_endpointpathitem,
+            self._association_pathitemoperation,
+            self._association_datasetdataflow,
+            self._association_directionaldataflow
+        ])
+        self._references = ReferenceIndex()
     
     @staticmethod
     def packagename():
         return 'com.informatica.ldm.openapi'
+
+    @staticmethod
+    def version():
+        """ bump when the produced objects or links change """
+        return '3'
     
     @property
     def object_csv_header(self):
@@ -65,6 +109,15 @@ class OpenAPIModel():
     @property
     def associations(self):
         return self._associations
+
+    @property
+    def references(self):
+        return self._references
+
+    @property
+    def truncated(self):
+        """ (schema identity, reason) of every schema whose children were cut by max_depth or max_nodes """
+        return self._truncated
     
     @property
     def endpoint(self):
@@ -94,83 +147,410 @@ class OpenAPIModel():
     def operations(self):
         return self._operations
     
-    def build_schema(self, schema):
-        self._schemas.append(schema)
-        schemachildren = schema.children()
+    def walk_schema(self, schema):
+        """
+        yield the schema, its properties and sub schemas (depth first) together with their associations.
+
+        the tree is walked with an explicit stack of (schema, children iterator, depth, fingerprint,
+        log start), so nesting is not limited by the recursion limit. a sub schema is yielded
+        before its children and linked to its parent once all of them are done, the same order
+        as a recursive walk.
+
+        with dedup_schemas, the objects below a schema with a fingerprint are logged and kept as
+        its Subtree once it is done. a later schema of the same fingerprint is linked to it
+        instead of being walked, see duplicate()
+        """
+        yield from self._enter_schema(schema)
+        key = self.fingerprint(schema)
+
+        if key in self._canonical:
+            yield from self.duplicate(schema, self._canonical[key], [])
+            return
+
+        stack = [(schema, self._expand(schema, 0), 0, key, 0)]
+        # (identity, location, isproperty) of the objects walked while a schema with a fingerprint is open
+        log = []
+        recording = 0 if key is None else 1
+        nodes = 1
+
+        while stack:
+            parent, children, depth, key, start = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                stack.pop()
+
+                if key is not None:
+                    self._canonical.setdefault(key, Subtree(parent.id, parent.location, log[start:]))
+                    recording -= 1
+
+                    if not recording:
+                        log = []
+
+                if stack:
+                    yield (self._association_schemaschema, stack[-1][0].id, parent.id)
+                continue
+
+            if self._max_nodes is not None and nodes >= self._max_nodes:
+                # budget spent: close the open schemas without visiting more children
+                self.truncate(schema, f'more than {self._max_nodes} nodes')
+                stack = [(s, iter(()), d, k, l) for s, _, d, k, l in stack]
+                continue
+
+            nodes += 1
 
-        for child in schemachildren:
             if type(child) == Schema:
-                self.build_schema(child)
+                yield from self._enter_schema(child)
 
-                self._associations[self._association_schemaschema].append({
-                    'fromObjectIdentity': schema.id,
-                    'toObjectIdentity': child.id
-                })
+                if recording and not child.reference:
+                    log.append((child.id, child.location, False))
+
+                key = self.fingerprint(child)
+
+                if key in self._canonical:
+                    yield from self.duplicate(child, self._canonical[key], log if recording else [])
+                    yield (self._association_schemaschema, parent.id, child.id)
+                    continue
+
+                if key is not None:
+                    recording += 1
+
+                stack.append((child, self._expand(child, depth + 1), depth + 1, key, len(log)))
             elif type(child) == SchemaProperty:
-                self._properties.append(child)
+                self._references.add(child.location, child.id, True)
+
+                if recording:
+                    log.append((child.id, child.location, True))
 
-                self._associations[self._association_schemaproperty].append({
-                    'fromObjectIdentity': schema.id,
-                    'toObjectIdentity': child.id
-                })
+                yield child
+                yield (self._association_schemaproperty, parent.id, child.id)
             else:
                 logger.warning(f'[WARNING] unknown type of {child.path} detected')
 
-    def build(self, endpoint, spec):
+    def fingerprint(self, schema):
+        """ with dedup_schemas, the fingerprint of the value of schema, None if it is a reference or has none """
+        if not self._dedup_schemas or schema.reference or not schema.schemavalue:
+            return None
+
+        fingerprint = self._fingerprints.get(schema.schemavalue)
+
+        if fingerprint is None:
+            return None
+
+        # children below a schema without location have none either
+        return (fingerprint, schema.location is not None)
+
+    def duplicate(self, schema, subtree, log):
+        """
+        link schema to the schema subtree was walked below. the locations below schema are
+        indexed as the objects of subtree, so a $ref into the duplicate finds those
+        """
+        for location, identity, isproperty in subtree.below(schema):
+            self._references.add(location, identity, isproperty)
+            log.append((identity, location, isproperty))
+
+        yield (self._association_schemaschema, schema.id, subtree.id)
+
+    def _enter_schema(self, schema):
+        # a reference is a link to a schema defined elsewhere, not a location of its own
+        if not schema.reference:
+            self._references.add(schema.location, schema.id)
+
+        yield schema
+
+        if schema.reference and not schema.reference.startswith('#'):
+            # other documents are not read with lazy_refs, none of their schemas is an object to link to
+            logger.warning(f'[WARNING] {schema.reference} of {schema.id} is in another document, not linked')
+        elif schema.reference:
+            yield (self._association_schemaschema, schema.id, self.reference_identity(schema.reference))
+
+    def _expand(self, schema, depth):
+        """ iterator over the children of schema, empty below max_depth """
+        if self._max_depth is not None and depth >= self._max_depth:
+            if schema.children(self._lazy_refs, self._composer):
+                self.truncate(schema, f'deeper than {self._max_depth}')
+            return iter(())
+
+        return iter(schema.children(self._lazy_refs, self._composer))
+
+    def truncate(self, schema, reason):
+        logger.warning(f'[WARNING] children of schema {schema.id} dropped: {reason}')
+        self._truncated.append((schema.id, reason))
+
+    def walk(self, endpoint, spec, refspec=None):
+        """
+        generator over the model: yields every Identifier as soon as it is created and every
+        association as a tuple (associationname, fromObjectIdentity, toObjectIdentity).
+        nothing is kept after it was yielded, so the consumer decides what to hold in memory.
+
+        refspec is the spec before its $ref were resolved (default spec), operations are linked
+        to the schemas they reference there, see lineage()
+        """
+        yield from self.walk_head(endpoint, spec, refspec)
+        yield from self.walk_schemas()
+        self.schemas_walked()
+        yield from self.walk_paths()
+
+    def walk_head(self, endpoint, spec, refspec=None):
+        """ start a walk of spec: the endpoint, its info and external docs """
         self._spec = spec
+        self._refspec = refspec if refspec is not None else spec
+        self._truncated = []
+        self._fingerprints.clear()
+        self._canonical = {}
+        self._composer.clear()
         self._endpoint = Endpoint(endpoint, endpoint, self._spec)
-        self._associations[self._association_resourceparanchild].append({
-            'fromObjectIdentity': '',
-            'toObjectIdentity': self._endpoint.id
-        })
+        self._objects_head = self._endpoint._objects_head
+        yield self._endpoint
+        yield (self._association_resourceparanchild, '', self._endpoint.id)
 
-        self._info = Info(endpoint+ '/Info', 'Info', self._spec)
-        self._associations[self._association_endpointinfo].append({
-            'fromObjectIdentity': self._endpoint.id,
-            'toObjectIdentity': self._info.id
-        })
+        info = Info(endpoint+ '/Info', 'Info', self._spec)
+        yield info
+        yield (self._association_endpointinfo, self._endpoint.id, info.id)
 
-        self._externaldocs = ExternalDocs(endpoint + '/' + 'externalDocs', 'externalDocs', self._spec)        
-        self._objects_head = self._endpoint._objects_head
+        yield ExternalDocs(endpoint + '/' + 'externalDocs', 'externalDocs', self._spec)
 
+    def walk_schemas(self, names=None):
+        """ the top level schemas (only names if given, in that order) """
+        endpoint = self._endpoint.id
         toplevelschemas = self.safe_get('components.schemas', self._spec)
-        for schemaname, schemavalue in toplevelschemas.items():
+
+        for schemaname in (toplevelschemas if names is None else names):
+            schemavalue = toplevelschemas[schemaname]
             # TODO: if the toplevel already has schema array?
             schema = Schema(endpoint + '/components/schemas/' + schemaname, schemaname, self._spec)
-            self.build_schema(schema)
+            schema._location = '#/components/schemas/' + ReferenceIndex.escape(schemaname)
 
-            self._associations[self._association_enndpointschema].append({
-                'fromObjectIdentity': self._endpoint.id,
-                'toObjectIdentity': schema.id
-            })
-        
+            if self._lazy_refs and isinstance(schemavalue, dict) and '$ref' in schemavalue:
+                # alias of another schema
+                ref, value = schema.dereference(schemavalue)
+                schema.set_reference(ref, value)
+                self._references.add(schema.location, schema.id)
+
+            yield from self.walk_schema(schema)
+            yield (self._association_enndpointschema, self._endpoint.id, schema.id)
+
+    def schemas_walked(self):
+        """ the schemas are done, only paths follow """
+        self._fingerprints.clear()
+        self._canonical = {}
+        self._composer.clear()
+
+        if self._truncated:
+            logger.warning(f'[WARNING] {len(self._truncated)} schemas of {self._endpoint.id} truncated, see --max-depth and --max-nodes')
+
+    def walk_paths(self, names=None):
+        """ the path items (only names if given, in that order), their operations and lineage """
+        endpoint = self._endpoint.id
         paths = self.safe_get('paths', self._spec)
+        refpaths = self.safe_get('paths', self._refspec) or {}
 
-        for pathitemname, pathitemvalue in paths.items():
+        for pathitemname in (paths if names is None else names):
             pathitem = PathItem(endpoint + '/paths/' + pathitemname, pathitemname, self._spec)
-            self._paths.append(pathitem)
-            self._operations.extend(pathitem.operations())
+            yield pathitem
+            yield (self._association_endpointpathitem, self._endpoint.id, pathitem.id)
 
-            self._associations[self._association_endpointpathitem].append({
-                'fromObjectIdentity': self._endpoint.id,
-                'toObjectIdentity': pathitem.id
-            })
-        
             for operation in pathitem.operations():
-                self._associations[self._association_pathitemoperation].append({
-                    'fromObjectIdentity': pathitem.id,
-                    'toObjectIdentity': operation.id
-                })
-    
+                yield operation
+                yield (self._association_pathitemoperation, pathitem.id, operation.id)
+                yield from self.lineage(operation, self.follow(refpaths.get(pathitemname)))
+
+    def walk_batch(self, kind, names):
+        """
+        walk only the top level schemas or path items (kind 'schemas' or 'paths') names of the
+        spec of walk_head(), for a walk split across processes (see parser.partition). returns
+        the items with objects as their rows (lists, see Rendered), the locations indexed
+        (schemas) and the truncated schemas. paths are linked through the reference index as it is
+        """
+        self._truncated = []
+
+        if kind == 'schemas':
+            self._references = ReferenceIndex()
+            items = [item if type(item) == tuple else item.row() for item in self.walk_schemas(names)]
+            return items, list(self._references.items()), self._truncated
+
+        return [item if type(item) == tuple else item.row() for item in self.walk_paths(names)], [], []
+
+    def lineage(self, operation, pathitemvalue):
+        """
+        dataflow links of an operation: from the schemas (or properties) referenced by its
+        parameters and request body to the operation, and from the operation to the ones
+        referenced by its responses. schemas are DataSetDataFlow, properties DirectionalDataFlow
+        """
+        if operation.name not in HTTP_METHODS or not isinstance(pathitemvalue, dict):
+            return
+
+        value = self.follow(pathitemvalue.get(operation.name))
+
+        if not isinstance(value, dict):
+            return
+
+        inputs = []
+
+        for parameter in (pathitemvalue.get('parameters') or []) + (value.get('parameters') or []):
+            parameter = self.follow(parameter)
+
+            if isinstance(parameter, dict):
+                inputs.append(parameter.get('schema'))
+                inputs.extend(self.media_schemas(parameter))
+
+        inputs.extend(self.media_schemas(self.follow(value.get('requestBody'))))
+        outputs = []
+
+        for response in (value.get('responses') or {}).values():
+            outputs.extend(self.media_schemas(self.follow(response)))
+
+        for identity, isproperty in self.targets(inputs):
+            association = self._association_directionaldataflow if isproperty else self._association_datasetdataflow
+            yield (association, identity, operation.id)
+
+        for identity, isproperty in self.targets(outputs):
+            association = self._association_directionaldataflow if isproperty else self._association_datasetdataflow
+            yield (association, operation.id, identity)
+
+    def follow(self, value):
+        """ value with local $ref followed in refspec (e.g. to components.parameters) """
+        seen = set()
+
+        while isinstance(value, dict) and isinstance(value.get('$ref'), str) and value['$ref'] not in seen:
+            seen.add(value['$ref'])
+            value = self.resolve_pointer(value['$ref'], self._refspec)
+
+        return value
+
+    @staticmethod
+    def media_schemas(value):
+        """ schemas of the media types of a request body, response or parameter """
+        content = value.get('content') if isinstance(value, dict) else None
+
+        if not isinstance(content, dict):
+            return []
+
+        return [media.get('schema') for media in content.values() if isinstance(media, dict)]
+
+    def targets(self, schemas):
+        """
+        (identity, isproperty) of every $ref in schemas, looked up in the reference index.
+        inline schemas are searched (items, properties, allOf, ...), references are not followed
+        """
+        targets = []
+        stack = list(reversed(schemas))
+
+        while stack:
+            value = stack.pop()
+
+            if not isinstance(value, dict):
+                continue
+
+            ref = value.get('$ref')
+
+            if isinstance(ref, str):
+                target = self._references.get(ref)
+
+                if target is None:
+                    logger.debug(f'[DEBUG] {ref} is not a schema of {self._endpoint.id}')
+                elif target not in targets:
+                    targets.append(target)
+                continue
+
+            nested = [value.get('items'), value.get('additionalProperties'), value.get('not')]
+
+            for composition in ('allOf', 'oneOf', 'anyOf'):
+                if isinstance(value.get(composition), list):
+                    nested.extend(value[composition])
+
+            if isinstance(value.get('properties'), dict):
+                nested.extend(value['properties'].values())
+
+            stack.extend(reversed(nested))
+
+        return targets
+
+    def build(self, endpoint, spec, refspec=None, items=None):
+        """ keep the items of walk(), or of items if the spec was walked elsewhere (see parser.partition) """
+        for item in (items if items is not None else self.walk(endpoint, spec, refspec)):
+            if type(item) == tuple:
+                self._associations.add(*item)
+            elif type(item) == Info:
+                self._info = item
+            elif type(item) == ExternalDocs:
+                self._externaldocs = item
+            elif type(item) == Schema:
+                self._schemas.append(item)
+            elif type(item) == SchemaProperty:
+                self._properties.append(item)
+            elif type(item) == PathItem:
+                self._paths.append(item)
+            elif type(item) == Operation:
+                self._operations.append(item)
+            elif type(item) == Rendered:
+                self._rendered[item.classname].append(item)
+
+    def reference_identity(self, ref):
+        """ identity of the object a local $ref points to, e.g. #/components/schemas/X -> <endpoint>/components/schemas/X """
+        return self._endpoint.id + ref[1:].replace('~1', '/').replace('~0', '~')
+
+    @staticmethod
+    def resolve_pointer(ref, spec):
+        """ value of a local $ref (#/...) in spec, None for other documents or unknown pointers """
+        if not ref.startswith('#/'):
+            return None
+
+        value = spec
+        for key in ref[2:].split('/'):
+            key = key.replace('~1', '/').replace('~0', '~')
+
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+
+        return value
+
     @staticmethod
     def safe_get(keys, spec, default=None):
         from functools import reduce
         return reduce(lambda d, key: d.get(key, default) if isinstance(d, dict) else default, keys.split("."), spec)
 
 class Identifier():
+    __slots__ = ('_id', '_path', '_ref', '_name', '_description', '_spec')
+
+    _packagename = OpenAPIModel.packagename()
+    _classname = ''
+
+    """ 1) model attribute """
+    _attr_endpoint_version = _packagename + '.openapi'
+    _attr_infoversion = _packagename + '.infoversion'
+    _attr_infotitle = _packagename + '.infotitle'
+    _attr_infodescription = _packagename + '.infodescription'
+    _attr_infotermsOfService = _packagename + '.infotermsOfService'
+    _attr_infocontactemail = _packagename + '.infocontactemail'
+    _attr_infolicensename = _packagename + '.infolicensename'
+    _attr_externaldocs_url = _packagename + '.externaldocsurl'
+    _attr_property_example = _packagename + '.propertyexample'
+    _attr_isarray = _packagename + '.schemapropertyarray'
+
+    """ 2) base attribute (inherited from base model) """
+    _attr_property_primarykey = 'com.infa.ldm.relational.PrimaryKeyColumn'
+    _attr_property_datatype = 'com.infa.ldm.relational.Datatype'
+    _attr_property_dataformat = 'com.infa.ldm.relational.FieldFormat'
+    _attr_property_nullable = 'com.infa.ldm.relational.Nullable'
+    _attr_property_maxlength = 'com.infa.ldm.relational.DatatypeLength'
+    _attr_property_scale = 'com.infa.ldm.relational.DatatypeScale'
+
+    """ header and column layout, completed once below the class """
+    _objects_head = {
+        'class': '',
+        'identity': '',
+        'core.name': '',
+        'core.description': ''
+    }
+    _columns = None
+    _column_index = None
+
     def __init__(self, id, name, description=None, spec=None):
-        self._packagename = OpenAPIModel.packagename()
-        self._classname = ''
         self._id = id
         self._path = ''
         self._ref = ''
@@ -178,37 +558,6 @@ class Identifier():
         self._description = description
         self._spec = spec
 
-        """ 1) model attribute """
-        self._attr_endpoint_version = self._packagename + '.openapi'
-        self._attr_infoversion = self._packagename + '.infoversion'
-        self._attr_infotitle = self._packagename + '.infotitle'
-        self._attr_infodescription = self._packagename + '.infodescription'
-        self._attr_infotermsOfService = self._packagename + '.infotermsOfService'
-        self._attr_infocontactemail = self._packagename + '.infocontactemail'
-        self._attr_infolicensename = self._packagename + '.infolicensename'
-        self._attr_externaldocs_url = self._packagename + '.externaldocsurl'
-        self._attr_property_example = self._packagename + '.propertyexample'
-        self._attr_isarray = self._packagename + '.schemapropertyarray'
-
-        """ 2) base attribute (inherited from base model) """
-        self._attr_property_primarykey = 'com.infa.ldm.relational.PrimaryKeyColumn'
-        self._attr_property_datatype = 'com.infa.ldm.relational.Datatype'
-        self._attr_property_dataformat = 'com.infa.ldm.relational.FieldFormat'
-        self._attr_property_nullable = 'com.infa.ldm.relational.Nullable'
-        self._attr_property_maxlength = 'com.infa.ldm.relational.DatatypeLength'
-        self._attr_property_scale = 'com.infa.ldm.relational.DatatypeScale'
-
-        self._objects_head = {
-            'class': '',
-            'identity': '',
-            'core.name': '',
-            'core.description': ''
-        }
-
-        for attr, attrval in vars(self).items():
-            if attr.startswith('_attr_'):
-                self._objects_head[attrval] = ''
-    
     @property
     def classname(self):
         return self._classname
@@ -237,31 +586,66 @@ class Identifier():
     def reference(self):
         return self._ref
 
-    def build(self):
+    @property
+    def columns(self):
+        """ column layout of the object rows """
+        return self._columns
+
+    @property
+    def column_index(self):
+        return self._column_index
+
+    def new_row(self):
+        return [''] * len(self._columns)
+
+    def row(self):
+        """ positional row matching columns """
         pass
 
+    def build(self):
+        row = self.row()
+
+        if row is None:
+            return None
+
+        return dict(zip(self.columns, row))
+
+for attr, attrval in vars(Identifier).items():
+    if attr.startswith('_attr_'):
+        Identifier._objects_head[attrval] = ''
+
+Identifier._columns = tuple(Identifier._objects_head.keys())
+Identifier._column_index = {column: index for index, column in enumerate(Identifier._columns)}
+
 class Endpoint(Identifier):
+    __slots__ = ()
+
+    _classname = OpenAPIModel.packagename() + '.endpoint'
+
     def __init__(self, name, description=None, spec=None):
         super(Endpoint, self).__init__(name, name, description, spec)
-        self._classname = self._packagename + '.endpoint'
     
     @property
     def version(self):
         return OpenAPIModel.safe_get('openapi', self._spec)
     
-    def build(self):
-        endpoint = copy.deepcopy(self._objects_head)
-        endpoint['class'] = self.classname
-        endpoint['identity'] = self.id
-        endpoint['core.name'] = self.name
-        endpoint['core.description'] = self.description
-        endpoint[self._attr_endpoint_version] = self.version
+    def row(self):
+        i = self.column_index
+        endpoint = self.new_row()
+        endpoint[i['class']] = self.classname
+        endpoint[i['identity']] = self.id
+        endpoint[i['core.name']] = self.name
+        endpoint[i['core.description']] = self.description
+        endpoint[i[self._attr_endpoint_version]] = self.version
         return endpoint
 
 class Info(Identifier):
+    __slots__ = ()
+
+    _classname = OpenAPIModel.packagename() + '.info'
+
     def __init__(self, id, name, spec):
         super(Info, self).__init__(id, name, '', spec)
-        self._classname = self._packagename + '.info'
         deswithlinebreak = OpenAPIModel.safe_get('info.description', self._spec)
 
         if deswithlinebreak:
@@ -287,44 +671,56 @@ class Info(Identifier):
     def version(self):
         return OpenAPIModel.safe_get('info.version', self._spec)
 
-    def build(self):
-        super(Info, self).build()
-        info = copy.deepcopy(self._objects_head)
-        info['class'] = self.classname
-        info['identity'] = self.id
-        info['core.name'] = self.name
-        info['core.description'] = self.description
-        info[self._attr_infocontactemail] = self.contactemail
-        info[self._attr_infotitle] = self.title
-        info[self._attr_infotermsOfService] = self.termsOfService
-        info[self._attr_infolicensename] = self.licensename
-        info[self._attr_infoversion] = self.version
+    def row(self):
+        i = self.column_index
+        info = self.new_row()
+        info[i['class']] = self.classname
+        info[i['identity']] = self.id
+        info[i['core.name']] = self.name
+        info[i['core.description']] = self.description
+        info[i[self._attr_infocontactemail]] = self.contactemail
+        info[i[self._attr_infotitle]] = self.title
+        info[i[self._attr_infotermsOfService]] = self.termsOfService
+        info[i[self._attr_infolicensename]] = self.licensename
+        info[i[self._attr_infoversion]] = self.version
         return info
 
 class ExternalDocs(Identifier):
+    __slots__ = ()
+
+    _classname = OpenAPIModel.packagename() + '.externaldocs'
+
     def __init__(self, id, name, spec):
         super(ExternalDocs, self).__init__(id, name, '', spec)
-        self._classname = self._packagename + '.externaldocs'
         self._description = OpenAPIModel.safe_get('externalDocs.description', self._spec)
     
     @property
     def url(self):
         return OpenAPIModel.safe_get('externalDocs.url', self._spec)
     
-    def build(self):
-        super(ExternalDocs, self).build()
-        externalDocs = copy.deepcopy(self._objects_head)
-        externalDocs['class'] = self.classname
-        externalDocs['core.name'] = self.name
-        externalDocs['identity'] = self.id
-        externalDocs['core.description'] = self.description
-        externalDocs[self._attr_externaldocs_url] = self.url
+    def row(self):
+        i = self.column_index
+        externalDocs = self.new_row()
+        externalDocs[i['class']] = self.classname
+        externalDocs[i['core.name']] = self.name
+        externalDocs[i['identity']] = self.id
+        externalDocs[i['core.description']] = self.description
+        externalDocs[i[self._attr_externaldocs_url]] = self.url
         return externalDocs
 
 class Schema(Identifier):
-    def __init__(self, id, name, spec):
+    __slots__ = ('_children_initialized', '_children', '_isarray', '_example', '_schemavalue', '_location')
+
+    _classname = OpenAPIModel.packagename() + '.schema'
+    _path_regex = re.compile(r'components\/schemas\/\S+')
+
+    def __init__(self, id, name, spec, value=None, location=None):
+        """
+        value: the schema value if already known, otherwise it is looked up in spec by the path.
+        location: json pointer of the value in spec, see ReferenceIndex
+        """
         super(Schema, self).__init__(id, name, '', spec)
-        self._classname = self._packagename + '.schema'
+        self._location = location
         # TODO: schema description for 3.0.x
         self._description = ''
         self._children_initialized = False
@@ -332,16 +728,16 @@ class Schema(Identifier):
         self._isarray = False
         self._example = ''
 
-        import re
-        regex = 'components\/schemas\/\S+'
-        matches = re.finditer(regex, self.id)
+        match = self._path_regex.search(self.id)
 
-        for match in matches:
+        if match:
             self._path = match.group(0)
-            break
 
-        key = self.path.replace('/', '.')
-        self._schemavalue = OpenAPIModel.safe_get(key, self.spec)
+        if value is not None:
+            self._schemavalue = value
+        else:
+            key = self.path.replace('/', '.')
+            self._schemavalue = OpenAPIModel.safe_get(key, self.spec)
 
     @property
     def schemavalue(self):
@@ -360,19 +756,48 @@ class Schema(Identifier):
     @property
     def isarray(self):
         return self._isarray
+
+    @property
+    def location(self):
+        return self._location
+
+    def set_reference(self, ref, value):
+        """ point to ref instead of walking its value """
+        self._ref = ref
+        self._schemavalue = value
+        self._children_initialized = True
+
+    def dereference(self, value):
+        """ follow a chain of $ref. returns the first reference (or None) and the referenced value """
+        ref = None
+        seen = set()
+
+        while isinstance(value, dict) and '$ref' in value:
+            target = value['$ref']
+
+            if target in seen:
+                logger.warning(f'[WARNING] reference cycle over {target} detected in {self.path}')
+                return ref, None
+
+            seen.add(target)
+            ref = ref or target
+            value = OpenAPIModel.resolve_pointer(target, self.spec)
+
+        return ref, value
     
-    def build(self):
-        schema = copy.deepcopy(self._objects_head)
-        schema['class'] = self.classname
-        schema['core.name'] = self.name
-        schema['identity'] = self.id
-        schema['core.description'] = self.description
-        schema[self._attr_isarray] = self.isarray
-        schema[self._attr_property_example] = self._example
+    def row(self):
+        i = self.column_index
+        schema = self.new_row()
+        schema[i['class']] = self.classname
+        schema[i['core.name']] = self.name
+        schema[i['identity']] = self.id
+        schema[i['core.description']] = self.description
+        schema[i[self._attr_isarray]] = self.isarray
+        schema[i[self._attr_property_example]] = self._example
         return schema
     
     # children could be property or schema
-    def children(self):
+    def children(self, lazy_refs=False, composer=None):
         if self._children_initialized:
             return self._children
         
@@ -381,34 +806,45 @@ class Schema(Identifier):
             self._children_initialized = True
             return self._children
 
-        properties = None
-        # handle inheritage:
-        # 1) 'allOf':
-        if 'allOf' in self.schemavalue:
-            properties = dict()
-
-            for block in self.schemavalue['allOf']:
-                additional_properties = block.get('properties')
-
-                if additional_properties:
-                    properties.update(additional_properties)
-
-        else:
-            properties = self.schemavalue.get('properties')
+        # name -> (value, json pointer or None where unknown), allOf, oneOf and anyOf composed, see Composer
+        properties = (composer or Composer(lazy_refs)).properties(self)
 
         if not properties:
             logger.warning(f'[WARNING] Schema {self.path} without properties')
             self._children_initialized = True
             return self._children
         
-        for propertyname, propertyvalue in properties.items():
+        for propertyname, (propertyvalue, location) in properties.items():
+            ref = None
+
+            if lazy_refs:
+                ref, propertyvalue = self.dereference(propertyvalue)
+
+                if propertyvalue is None:
+                    # not resolvable here (e.g. other document): keep the link only
+                    childschema = Schema(self.id + '/properties/' + propertyname, propertyname, self.spec)
+                    childschema.set_reference(ref, None)
+                    self._children.append(childschema)
+                    continue
+
             if 'properties' in propertyvalue or propertyvalue.get('type') == 'object':
-                childschema = Schema(self.id + '/properties/' + propertyname, propertyname, self.spec)
-                childschema._schemavalue = propertyvalue
+                childschema = Schema(self.id + '/properties/' + propertyname, propertyname, self.spec, propertyvalue, location)
+
+                if ref:
+                    childschema.set_reference(ref, propertyvalue)
+
                 self._children.append(childschema)
-            elif propertyvalue.get('type') == 'array' and 'items' in propertyvalue and 'properties' in propertyvalue['items']:
-                childschema = Schema(self.id + '/properties/' + propertyname, propertyname, self.spec)
-                childschema._schemavalue = propertyvalue['items']
+                continue
+
+            items = propertyvalue.get('items')
+            itemsref = None
+
+            if lazy_refs and items is not None:
+                itemsref, items = self.dereference(items)
+                items = items if items is not None else {}
+
+            if propertyvalue.get('type') == 'array' and items is not None and 'properties' in items:
+                childschema = Schema(self.id + '/properties/' + propertyname, propertyname, self.spec, items, location and location + '/items')
                 childschema._description = propertyvalue.get('description')
                 childschema._isarray = True
                 examples = propertyvalue.get('example')
@@ -418,28 +854,32 @@ class Schema(Identifier):
                         childschema._example = json.dumps(example)
                         break
 
+                if itemsref:
+                    childschema.set_reference(itemsref, items)
+
                 self._children.append(childschema)
-            elif 'items' in propertyvalue and 'properties' not in propertyvalue['items']:
-                childproperty = SchemaProperty(self.id + '/properties/' + propertyname, propertyname, self.spec)
-                childproperty._property = propertyvalue['items']
+            elif items is not None and 'properties' not in items:
+                childproperty = SchemaProperty(self.id + '/properties/' + propertyname, propertyname, self.spec, items, location)
                 childproperty._isarray = True
                 self._children.append(childproperty)
             else:
-                childproperty = SchemaProperty(self.id + '/properties/' + propertyname, propertyname, self.spec)
-                childproperty._property = propertyvalue
+                childproperty = SchemaProperty(self.id + '/properties/' + propertyname, propertyname, self.spec, propertyvalue, location)
                 self._children.append(childproperty)
         
         self._children_initialized = True
         return self._children
 
 class SchemaProperty(Schema):
-    def __init__(self, id, name, spec):
-        super(SchemaProperty, self).__init__(id, name, spec)
-        self._classname = self._packagename + '.property'
-        self._property = None
+    __slots__ = ('_property', '_datatype')
+
+    _classname = OpenAPIModel.packagename() + '.property'
+
+    def __init__(self, id, name, spec, value=None, location=None):
+        super(SchemaProperty, self).__init__(id, name, spec, value, location)
+        self._property = value
         self._datatype = None
 
-        if self.path and not self._property:
+        if self.path and self._property is None:
             key = self.path.replace('/', '.')
             self._property = OpenAPIModel.safe_get(key, self.spec)
     
@@ -466,32 +906,37 @@ class SchemaProperty(Schema):
     def example(self):
         return self.val.get('example')
 
-    def build(self):
-        prop = copy.deepcopy(self._objects_head)
-        prop['class'] = self.classname
-        prop['core.name'] = self.name
-        prop['identity'] = self.id
-        prop['core.description'] = self.description
-        prop[self._attr_property_datatype] = self.datatype
-        prop[self._attr_property_dataformat] = self.dataformat
-        prop[self._attr_property_example] = self.example
-        prop[self._attr_isarray] = self.isarray
+    def row(self):
+        i = self.column_index
+        prop = self.new_row()
+        prop[i['class']] = self.classname
+        prop[i['core.name']] = self.name
+        prop[i['identity']] = self.id
+        prop[i['core.description']] = self.description
+        prop[i[self._attr_property_datatype]] = self.datatype
+        prop[i[self._attr_property_dataformat]] = self.dataformat
+        prop[i[self._attr_property_example]] = self.example
+        prop[i[self._attr_isarray]] = self.isarray
         return prop
 
 class PathItem(Identifier):
+    __slots__ = ('_operations', '_operations_initialized')
+
+    _classname = OpenAPIModel.packagename() + '.path'
+
     def __init__(self, id, name, spec):
         super(PathItem, self).__init__(id, name, '', spec)
-        self._classname = self._packagename + '.path'
         self._operations = []
         self._operations_initialized = False
     
-    def build(self):
-        pathitem = copy.deepcopy(self._objects_head)
-        pathitem['class'] = self.classname
-        #pathitem['core.name'] = self.name.replace('/', '', 1)
-        pathitem['core.name'] = self.name
-        pathitem['identity'] = self.id
-        pathitem['core.description'] = ''
+    def row(self):
+        i = self.column_index
+        pathitem = self.new_row()
+        pathitem[i['class']] = self.classname
+        #pathitem[i['core.name']] = self.name.replace('/', '', 1)
+        pathitem[i['core.name']] = self.name
+        pathitem[i['identity']] = self.id
+        pathitem[i['core.description']] = ''
         return pathitem
 
     def operations(self):
@@ -501,6 +946,10 @@ class PathItem(Identifier):
         val = self.spec.get('paths').get(self.name)
         
         for operationname, operationvalue in val.items():
+            # path level parameters, servers, summary, ...
+            if operationname not in HTTP_METHODS:
+                continue
+
             self._operations.append(
                 Operation(self.id + '/' + operationname, operationname, operationvalue.get('description'), self.spec)
             )
@@ -509,16 +958,33 @@ class PathItem(Identifier):
         return self._operations
 
 class Operation(Identifier):
+    __slots__ = ()
+
+    _classname = OpenAPIModel.packagename() + '.operation'
+
     def __init__(self, id, name, description, spec):
         super(Operation, self).__init__(id, name, description, spec)
-        self._classname = self._packagename + '.operation'
     
-    def build(self):  
-        operation = copy.deepcopy(self._objects_head)
-        operation['class'] = self.classname
-        operation['core.name'] = self.name
-        operation['identity'] = self.id
-        operation['core.description'] = self.description
+    def row(self):
+        i = self.column_index
+        operation = self.new_row()
+        operation[i['class']] = self.classname
+        operation[i['core.name']] = self.name
+        operation[i['identity']] = self.id
+        operation[i['core.description']] = self.description
         return operation
 
+class Rendered():
+    """ an object walked in another process, kept as its row, see OpenAPIModel.walk_batch() """
+    __slots__ = ('_classname', '_row')
+
+    def __init__(self, row):
+        self._classname = row[Identifier._column_index['class']]
+        self._row = row
+
+    @property
+    def classname(self):
+        return self._classname
 
+    def row(self):
+        return self._row
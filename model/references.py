@@ -0,0 +1,29 @@
+class ReferenceIndex():
+    """
+    locations of the schemas and properties of a spec, as json pointers the way a $ref
+    names them (#/components/schemas/Pet/properties/id), to the identity of the object
+    created for them and whether it is a property. filled while the schemas are walked,
+    so a $ref is linked with one lookup. the first object of a location is kept
+    """
+    def __init__(self):
+        self._targets = {}
+
+    @staticmethod
+    def escape(name):
+        """ a key as json pointer token """
+        return name.replace('~', '~0').replace('/', '~1')
+
+    def add(self, location, identity, isproperty=False):
+        if location is not None and location not in self._targets:
+            self._targets[location] = (identity, isproperty)
+
+    def items(self):
+        """ (location, (identity, isproperty)) in the order they were added """
+        return self._targets.items()
+
+    def get(self, ref):
+        """ (identity, isproperty) of the object at ref, None for unknown or non local references """
+        return self._targets.get(ref)
+
+    def __len__(self):
+        return len(self._targets)
@@ -0,0 +1,115 @@
+import hashlib
+
+class Fingerprints():
+    """
+    canonical hashes of json values: equal values have equal fingerprints, whatever their key
+    order. a dict or list is hashed over the fingerprints of its members, each object once (the
+    resolved specs of prance share the objects of a $ref). values containing a $ref have none,
+    what they stand for depends on the spec around them
+    """
+    def __init__(self):
+        # id -> (value, fingerprint), the value keeps its id from being reused
+        self._memo = {}
+
+    def clear(self):
+        self._memo = {}
+
+    def get(self, value):
+        """ fingerprint of value, None if it contains a $ref """
+        if not isinstance(value, (dict, list)):
+            return hashlib.blake2b(repr(value).encode(), digest_size=16).digest()
+
+        memo = self._memo
+
+        if id(value) in memo:
+            return memo[id(value)][1]
+
+        # post order over the containers, with an explicit stack (see walk_schema)
+        stack = [(value, False)]
+        # containers whose members are still hashed, a value containing itself has no fingerprint
+        pending = set()
+
+        while stack:
+            node, done = stack.pop()
+
+            if id(node) in memo:
+                continue
+
+            if not done:
+                if id(node) in pending:
+                    return None
+
+                pending.add(id(node))
+                stack.append((node, True))
+                members = node.values() if isinstance(node, dict) else node
+                stack.extend((member, False) for member in members if isinstance(member, (dict, list)) and id(member) not in memo)
+                continue
+
+            memo[id(node)] = (node, self.container(node))
+
+        return memo[id(value)][1]
+
+    def container(self, node):
+        memo = self._memo
+
+        if isinstance(node, dict):
+            if '$ref' in node:
+                return None
+
+            values = node.values()
+        else:
+            values = node
+
+        for value in values:
+            if isinstance(value, (dict, list)) and memo[id(value)][1] is None:
+                return None
+
+        if isinstance(node, dict):
+            members = ('{', sorted((key, self.member(value)) for key, value in node.items()))
+        else:
+            members = ('[', [self.member(item) for item in node])
+
+        return hashlib.blake2b(repr(members).encode(), digest_size=16).digest()
+
+    def member(self, value):
+        """ a scalar as it is (repr() tells 1, '1' and True apart), the fingerprint of a container """
+        if isinstance(value, (dict, list)):
+            return self._memo[id(value)][1]
+
+        return value
+
+class Subtree():
+    """
+    the objects walked below the schema id at location, as (identity, location, isproperty)
+    in walk order, see OpenAPIModel.walk_schema()
+    """
+    __slots__ = ('_id', '_location', '_objects')
+
+    def __init__(self, id, location, objects):
+        self._id = id
+        self._location = location
+        self._objects = objects
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def location(self):
+        return self._location
+
+    @property
+    def objects(self):
+        return self._objects
+
+    def relocate(self, location, base):
+        """ location below self moved below base, None where either is not known """
+        if location is None or base is None or self._location is None:
+            return None
+
+        return base + location[len(self._location):]
+
+    def below(self, schema):
+        """ (location below schema, identity, isproperty) of the objects """
+        for identity, location, isproperty in self._objects:
+            yield self.relocate(location, schema.location), identity, isproperty
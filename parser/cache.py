@@ -0,0 +1,149 @@
+import logging
+import re
+
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+from model.model import OpenAPIModel
+
+# the document part of a $ref to another document (json or yaml), e.g. common/errors.json of common/errors.json#/Error
+EXTERNAL_REF = re.compile(rb'''\$ref['"]?\s*:\s*['"]?([^'"#\s,}]+)''')
+
+class ScanCache():
+    """
+    objects.csv and links.csv of already scanned specs, keyed by the content hash of
+    the spec file and of the documents it refers to by $ref, its name (part of every
+    identity), the scanner version and the options which change the output. a spec
+    referring to a document which is not a local file is not cached
+    """
+    def __init__(self, dir):
+        import os
+        os.makedirs(dir, exist_ok=True)
+        self._dir = dir
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def scanner_version():
+        """ model version plus a digest of the scanner sources, so code changes invalidate the cache """
+        import hashlib
+        import os
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha256(OpenAPIModel.version().encode())
+
+        # every module of model/ and parser/, a module added later is not missed
+        for package in ('model', 'parser'):
+            for source in sorted(f for f in os.listdir(os.path.join(root, package)) if f.endswith('.py')):
+                digest.update(f'{package}/{source}'.encode() + b'\0')
+
+                with open(os.path.join(root, package, source), 'rb') as f:
+                    digest.update(f.read())
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_hash(path):
+        import hashlib
+        digest = hashlib.sha256()
+
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def documents(spec_path):
+        """
+        content hashes of the spec file and of every local document it refers to (and those
+        refer to), by path. None if one of them is referred to by an url
+        """
+        import hashlib
+        import os
+        from urllib.parse import unquote, urlsplit
+
+        hashes = {}
+        paths = [os.path.abspath(spec_path)]
+
+        while paths:
+            path = paths.pop()
+
+            if path in hashes:
+                continue
+
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            except OSError:
+                # prance fails on it, which is not cached
+                hashes[path] = 'missing'
+                continue
+
+            hashes[path] = hashlib.sha256(content).hexdigest()
+
+            for ref in set(EXTERNAL_REF.findall(content)):
+                parts = urlsplit(ref.decode('utf-8', 'replace'))
+
+                if parts.scheme not in ('', 'file'):
+                    return None
+
+                paths.append(os.path.normpath(os.path.join(os.path.dirname(path), unquote(parts.path))))
+
+        return hashes
+
+    def key(self, spec_path, spec_json, options=()):
+        """ the key of a spec, None if it can't be cached (see documents()) """
+        import hashlib
+        import os
+
+        documents = self.documents(spec_path)
+
+        if documents is None:
+            return None
+
+        digest = hashlib.sha256()
+        spec = os.path.abspath(spec_path)
+        # the documents by path relative to the spec, moving the input dir keeps the key
+        references = tuple(f'{os.path.relpath(path, os.path.dirname(spec))}={value}' for path, value in sorted(documents.items()) if path != spec)
+
+        for part in (documents[spec], spec_json, self.scanner_version()) + references + tuple(str(o) for o in options):
+            digest.update(part.encode())
+            digest.update(b'\0')
+
+        return digest.hexdigest()
+
+    def get(self, key, objectfile, linkfile):
+        """ copy the cached rows to objectfile and linkfile. returns False if key is not cached """
+        import os
+        import shutil
+
+        entry = os.path.join(self._dir, key)
+
+        if not os.path.exists(os.path.join(entry, 'links.csv')):
+            return False
+
+        shutil.copyfile(os.path.join(entry, 'objects.csv'), objectfile)
+        shutil.copyfile(os.path.join(entry, 'links.csv'), linkfile)
+        return True
+
+    def put(self, key, objectfile, linkfile):
+        """ store the rows of a scan. written to a tmp dir first, workers may store the same key """
+        import os
+        import shutil
+        import tempfile
+
+        entry = os.path.join(self._dir, key)
+
+        if os.path.exists(entry):
+            return
+
+        tmp = tempfile.mkdtemp(prefix='.' + key[0:6], dir=self._dir)
+
+        try:
+            shutil.copyfile(objectfile, os.path.join(tmp, 'objects.csv'))
+            shutil.copyfile(linkfile, os.path.join(tmp, 'links.csv'))
+            os.rename(tmp, entry)
+        except OSError as ex:
+            logger.warning(f'[WARNING] could not cache {objectfile}: {ex}')
+            shutil.rmtree(tmp, ignore_errors=True)
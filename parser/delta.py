@@ -0,0 +1,180 @@
+import logging
+
+from parser.output import batches
+
+logger = logging.getLogger(__name__)
+
+# columns of changes.csv, class is the association of a link and identity its fromObjectIdentity
+CHANGES_HEADER = ('change', 'kind', 'class', 'identity', 'toIdentity', 'fingerprint')
+
+def fingerprint(row):
+    """ digest of a row as it is written to csv (None as empty, everything else as str), stable across runs """
+    import hashlib
+    return hashlib.blake2b('\x1f'.join('' if value is None else str(value) for value in row).encode(), digest_size=8).hexdigest()
+
+class DeltaExport():
+    """
+    compares the merged rows of a scan with the ones of the previous scan and writes only the
+    difference to path (delta.zip): objects.csv and links.csv with the added and changed rows,
+    importable like metadata.zip, and changes.csv listing every added, changed and removed row
+    with its fingerprint.
+
+    the identity (objects) or association and both identities (links) and the fingerprint of
+    every row of the last scan are kept in the sqlite file state. rows are looked up there
+    ROW_BATCH_SIZE at a time, so memory does not grow with the catalog. the state is only
+    committed on close(), a failed export leaves the previous one in place
+    """
+    def __init__(self, state, path):
+        import csv
+        import os
+        import sqlite3
+        import tempfile
+        from parser.output import MetadataZip
+
+        self._path = path
+        self._db = sqlite3.connect(state)
+        self._db.execute('CREATE TABLE IF NOT EXISTS rows (kind TEXT, key TEXT, class TEXT, fingerprint TEXT, seen INTEGER, PRIMARY KEY (kind, key)) WITHOUT ROWID')
+        # rows not seen again by close() were removed
+        self._db.execute('UPDATE rows SET seen = 0')
+        self._zip = MetadataZip(path)
+        self._changes = tempfile.TemporaryFile('w+', encoding='UTF8', newline='', dir=os.path.dirname(os.path.abspath(path)))
+        self._changes_writer = csv.writer(self._changes, lineterminator=os.linesep)
+        self._changes_writer.writerow(CHANGES_HEADER)
+        self._counts = {kind: {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0} for kind in ('object', 'link')}
+
+    @property
+    def counts(self):
+        return self._counts
+
+    def write_objects(self, header, rows):
+        header = tuple(header)
+        identity = header.index('identity')
+        cls = header.index('class')
+        self._zip.write_objects(header, [])
+
+        for batch in batches(rows):
+            keys = [(row[identity], row[cls], None, row) for row in batch]
+            self._zip.write_objects(header, self.diff('object', keys))
+
+    def write_links(self, header, rows):
+        header = tuple(header)
+        self._zip.write_links(header, [])
+
+        for batch in batches(rows):
+            keys = [('\x1f'.join(row[0:3]), row[0], row[2], row) for row in batch]
+            self._zip.write_links(header, self.diff('link', keys))
+
+    def diff(self, kind, keys):
+        """ the added and changed rows of (key, class, to identity, row) of one batch, the state is updated """
+        placeholders = ','.join('?' * len(keys))
+        known = {key: (fp, seen) for key, fp, seen in self._db.execute(f'SELECT key, fingerprint, seen FROM rows WHERE kind = ? AND key IN ({placeholders})', [kind] + [key for key, _, _, _ in keys])}
+        updates = []
+        rows = []
+
+        for key, cls, to, row in keys:
+            fp = fingerprint(row)
+            previous, seen = known.get(key, (None, 0))
+
+            if seen:
+                # the same identity (or link) twice in one scan, the first one counts
+                continue
+
+            known[key] = (fp, 1)
+            updates.append((kind, key, cls, fp))
+
+            if previous == fp:
+                self._counts[kind]['unchanged'] += 1
+                continue
+
+            change = 'added' if previous is None else 'changed'
+            self._counts[kind][change] += 1
+            self._changes_writer.writerow((change, kind, cls, key.split('\x1f')[1] if kind == 'link' else key, to, fp))
+            rows.append(row)
+
+        self._db.executemany('INSERT INTO rows VALUES (?, ?, ?, ?, 1) ON CONFLICT (kind, key) DO UPDATE SET class = excluded.class, fingerprint = excluded.fingerprint, seen = 1', updates)
+        return rows
+
+    def diff_output(self, dir):
+        """ diff the merged output of dir: objects.csv and links.csv, metadata.zip or the shards of manifest.json """
+        import io
+        import json
+        import os
+        from zipfile import ZipFile
+
+        if os.path.exists(os.path.join(dir, 'objects.csv')):
+            self.diff_files(os.path.join(dir, 'objects.csv'), os.path.join(dir, 'links.csv'))
+            return
+
+        if os.path.exists(os.path.join(dir, 'manifest.json')):
+            with open(os.path.join(dir, 'manifest.json')) as f:
+                zips = [os.path.join(dir, shard['file']) for shard in json.load(f)['shards']]
+        else:
+            zips = [os.path.join(dir, 'metadata.zip')]
+
+        for path in zips:
+            with ZipFile(path) as metadata:
+                with io.TextIOWrapper(metadata.open('objects.csv'), encoding='UTF8', newline='') as objects:
+                    with io.TextIOWrapper(metadata.open('links.csv'), encoding='UTF8', newline='') as links:
+                        self.diff_csv(objects, links)
+
+    def diff_files(self, objectfile, linkfile):
+        with open(objectfile, encoding='UTF8', newline='') as objects:
+            with open(linkfile, encoding='UTF8', newline='') as links:
+                self.diff_csv(objects, links)
+
+    def diff_csv(self, objects, links):
+        import csv
+
+        for f, write in ((objects, self.write_objects), (links, self.write_links)):
+            reader = csv.reader(f)
+            header = next(reader, None)
+
+            if header:
+                write(header, reader)
+
+    def close(self):
+        """ write the removed rows, commit the state and finish delta.zip """
+        import io
+        import shutil
+        from zipfile import ZipFile, ZIP_DEFLATED
+
+        for kind, key, cls, fp in self._db.execute('SELECT kind, key, class, fingerprint FROM rows WHERE seen = 0'):
+            self._counts[kind]['removed'] += 1
+
+            if kind == 'link':
+                _, identity, to = key.split('\x1f')
+            else:
+                identity, to = key, None
+
+            self._changes_writer.writerow(('removed', kind, cls, identity, to, fp))
+
+        self._db.execute('DELETE FROM rows WHERE seen = 0')
+        self._db.commit()
+        self._db.close()
+        self._zip.close()
+
+        with ZipFile(self._path, 'a', compression=ZIP_DEFLATED) as delta:
+            with io.TextIOWrapper(delta.open('changes.csv', 'w', force_zip64=True), encoding='UTF8', newline='') as changes:
+                self._changes.seek(0)
+                shutil.copyfileobj(self._changes, changes, 1 << 20)
+
+        self._changes.close()
+
+        for kind, counts in self._counts.items():
+            logger.info(f'[INFO] {kind}s {counts["added"]} added, {counts["changed"]} changed, {counts["removed"]} removed, {counts["unchanged"]} unchanged')
+
+    def __enter__(self):
+        return self
+
+    def abort(self):
+        """ drop the export, the state stays the one of the previous scan """
+        self._db.rollback()
+        self._db.close()
+        self._zip.close()
+        self._changes.close()
+
+    def __exit__(self, *exc):
+        if exc[0]:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,199 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# spec files taken without --include
+DISCOVERY_INCLUDE = ('*.json',)
+
+# directories scanned at the same time
+DISCOVERY_WORKERS = 8
+
+def flat(spec_json):
+    """ spec name (a path relative to the input dir) usable as a file name, e.g. orders/v1.json -> orders__v1.json """
+    return spec_json.replace(os.sep, '__')
+
+class SpecDiscovery():
+    """
+    finds the spec files below dir: the files whose path relative to dir (or whose name)
+    matches one of include and none of exclude. a directory matching exclude is not entered.
+    with recursive the subdirectories are scanned too, by a pool of worker threads. a symlink
+    to a directory is only followed with follow_symlinks, and only if it leads out of dir (the
+    directories below dir are scanned anyway), each directory once. a symlink to a file is
+    taken like the file. two specs with the same output name (see flat()) fail the walk, the
+    second one found is not taken
+
+    files() yields the spec names as they are found, while the walk goes on in the background.
+    iterating the SpecDiscovery itself yields them sorted, once the walk is done
+    """
+    def __init__(self, dir, include=None, exclude=None, recursive=False, follow_symlinks=False, workers=DISCOVERY_WORKERS):
+        self._dir = dir
+        self._include = tuple(include or DISCOVERY_INCLUDE)
+        self._exclude = tuple(exclude or ())
+        self._recursive = recursive
+        self._follow_symlinks = follow_symlinks
+        self._workers = max(1, workers)
+        self._found = []
+        self._error = None
+        self._pool = None
+
+    @staticmethod
+    def from_args(args):
+        return SpecDiscovery(args.input, args.include, args.exclude, args.recursive, args.follow_symlinks, args.discovery_workers)
+
+    @property
+    def recursive(self):
+        return self._recursive
+
+    def again(self):
+        """ a new SpecDiscovery of the same dir and patterns, e.g. to look for changes """
+        return SpecDiscovery(self._dir, self._include, self._exclude, self._recursive, self._follow_symlinks, self._workers)
+
+    def matches(self, patterns, relative, name):
+        from fnmatch import fnmatchcase
+        return any(fnmatchcase(relative, pattern) or fnmatchcase(name, pattern) for pattern in patterns)
+
+    def scan(self, relative):
+        """ (spec names, (subdirectory, whether it is a symlink)) of one directory, relative to dir """
+        files = []
+        dirs = []
+
+        with os.scandir(os.path.join(self._dir, relative) if relative else self._dir) as entries:
+            for entry in entries:
+                name = os.fsdecode(entry.name)
+                path = os.path.join(relative, name) if relative else name
+
+                try:
+                    if self._recursive and entry.is_dir(follow_symlinks=self._follow_symlinks):
+                        if not self.matches(self._exclude, path, name):
+                            dirs.append((path, entry.is_symlink()))
+                        continue
+
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    # e.g. a dangling symlink
+                    continue
+
+                if self.matches(self._include, path, name) and not self.matches(self._exclude, path, name):
+                    files.append(path)
+
+        return files, dirs
+
+    def start(self):
+        """ start the walk in the background, once """
+        import queue
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self._pool:
+            return
+
+        self._queue = queue.Queue()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        # directories submitted but not scanned yet
+        self._pending = 1
+        # (st_dev, st_ino) of the directories outside of dir entered by a symlink, which may lead back up
+        self._visited = set()
+        # output name (see flat()) -> spec name, orders/v1.json and orders__v1.json share one
+        self._names = {}
+        self._top = os.path.realpath(self._dir)
+        self._pool = ThreadPoolExecutor(max_workers=self._workers)
+        self._pool.submit(self.visit, '')
+
+    def visit(self, relative):
+        """ scan one directory in a worker, its specs go to the queue and its subdirectories to the pool """
+        try:
+            files, dirs = self.scan(relative)
+            dirs = [path for path, symlink in dirs if not symlink or self.enter(path)]
+
+            with self._lock:
+                files = [spec_json for spec_json in files if self.claim(spec_json)]
+                self._found.extend(files)
+                self._pending += len(dirs)
+
+            for spec_json in files:
+                self._queue.put(spec_json)
+
+            for path in dirs:
+                self._pool.submit(self.visit, path)
+        except OSError as ex:
+            if not relative:
+                self._error = ex
+            else:
+                logger.warning(f'[WARNING] {ex.filename} not scanned: {ex.strerror}')
+        except Exception as ex:
+            self._error = ex
+        finally:
+            with self._lock:
+                self._pending -= 1
+                done = self._pending == 0
+
+            if done:
+                # None once all specs are found
+                self._queue.put(None)
+                self._done.set()
+                self._pool.shutdown(wait=False)
+
+    def claim(self, spec_json):
+        """ whether the output name of spec_json is not taken by another spec, called with the lock held """
+        name = flat(spec_json)
+        other = self._names.setdefault(name, spec_json)
+
+        if other == spec_json:
+            return True
+
+        self._error = ValueError(f'{other} and {spec_json} are both written as {name}, rename or --exclude one of them')
+        return False
+
+    def enter(self, relative):
+        """ whether a symlink to a directory is followed: outside of dir and not entered before """
+        path = os.path.join(self._dir, relative)
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        if os.path.commonpath([self._top, os.path.realpath(path)]) == self._top:
+            return False
+
+        with self._lock:
+            if (stat.st_dev, stat.st_ino) in self._visited:
+                return False
+
+            self._visited.add((stat.st_dev, stat.st_ino))
+            return True
+
+    def files(self):
+        """ yield the spec names in the order they are found, the walk runs ahead in the background """
+        self.start()
+
+        while True:
+            spec_json = self._queue.get()
+
+            if spec_json is None:
+                break
+
+            yield spec_json
+
+        if self._error:
+            raise self._error
+
+    def wait(self):
+        """ the spec names found by the walk, sorted """
+        self.start()
+        self._done.wait()
+
+        if self._error:
+            raise self._error
+
+        return sorted(self._found)
+
+    def __iter__(self):
+        # a generator, iter() does not wait for the walk yet
+        yield from self.wait()
+
+    def __len__(self):
+        return len(self.wait())
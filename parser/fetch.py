@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# ETag and Last-Modified of the downloaded specs, next to them in the download dir
+STATE_FILE = '.fetch.state'
+
+def read_urls(path):
+    """ urls of a url list file, one per line. blank lines and lines starting with # are skipped """
+    urls = []
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+
+            if line and not line.startswith('#'):
+                urls.append(line)
+
+    return urls
+
+class SpecFetcher():
+    """
+    downloads spec urls into dir over one pooled keep-alive session, workers at a time.
+
+    every url is stored under a file name derived from it (see names()). the ETag and
+    Last-Modified of each download are kept in dir/.fetch.state and sent back with the
+    next request, a 304 answer keeps the file of the last download
+    """
+    def __init__(self, dir, workers=8, timeout=30):
+        import threading
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._dir = dir
+        self._workers = workers
+        self._timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._state = self.load_state()
+        self._stats = {'downloaded': 0, 'not_modified': 0, 'failed': 0}
+        # state and stats are updated by the fetching threads
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self._dir, STATE_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def save_state(self):
+        path = os.path.join(self._dir, STATE_FILE)
+
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._state, f, indent=2)
+
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def names(urls):
+        """ file name of every url, e.g. http://orders:8080/v1/openapi.json -> orders_8080_v1_openapi.json """
+        import hashlib
+        from urllib.parse import urlsplit
+
+        names = {}
+
+        for url in urls:
+            parts = urlsplit(url)
+            name = re.sub(r'[^A-Za-z0-9.-]+', '_', parts.netloc + parts.path + ('_' + parts.query if parts.query else '')).strip('_')
+
+            if not name.endswith('.json'):
+                name += '.json'
+
+            if name in names.values():
+                # e.g. urls only differing in characters replaced above
+                name = name[:-len('.json')] + '_' + hashlib.sha1(url.encode()).hexdigest()[0:8] + '.json'
+
+            names[url] = name
+
+        return names
+
+    def fetch(self, url, name):
+        """ download url to dir/name unless unchanged. returns name, or None if there is no copy of it """
+        path = os.path.join(self._dir, name)
+        state = self._state.get(name, {})
+        headers = {}
+
+        if os.path.exists(path) and state.get('url') == url:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+
+        try:
+            response = self._session.get(url, headers=headers, timeout=self._timeout)
+
+            if response.status_code == 304:
+                logger.info(f'[INFO] {url} not modified')
+                self.count('not_modified')
+                return name
+
+            response.raise_for_status()
+
+            with open(path + '.part', 'wb') as f:
+                f.write(response.content)
+
+            os.replace(path + '.part', path)
+        except Exception as ex:
+            self.count('failed')
+
+            if os.path.exists(path):
+                logger.warning(f'[WARNING] {url} failed ({ex}), the last download is scanned')
+                return name
+
+            logger.exception(f'[EXCEPTION] Failure fetching {url}: {ex}')
+            return None
+
+        with self._lock:
+            self._state[name] = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+
+        self.count('downloaded')
+        logger.info(f'[INFO] {url} downloaded to {path}')
+        return name
+
+    def fetch_all(self, urls):
+        """ yield the file name of every url as soon as it is downloaded (or known unchanged) """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        names = self.names(urls)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self._workers) as pool:
+                futures = [pool.submit(self.fetch, url, name) for url, name in names.items()]
+
+                for future in as_completed(futures):
+                    name = future.result()
+
+                    if name:
+                        yield name
+        finally:
+            self.save_state()
+
+    def close(self):
+        self._session.close()
@@ -1,25 +1,126 @@
-import copy
 import logging
 
 logger = logging.getLogger(__name__)
 
-from prance import ResolvingParser
+from prance import BaseParser, ResolvingParser
 from model.model import OpenAPIModel
+from parser.output import ROW_BATCH_SIZE, batches
+from parser.profiling import Profiler
+from parser.validation import SpecValidator
+
+def write_batched(writer, rows, size=ROW_BATCH_SIZE):
+    """ write an iterable of positional rows in batches of the given size, returns the number of rows """
+    count = 0
+
+    for batch in batches(rows, size):
+        writer.writerows(batch)
+        count += len(batch)
+
+    return count
 
 class OpenAPIParser():
-    def __init__(self, endpoint, spec_string, dir, debug=False):
-        parser = ResolvingParser(spec_string=spec_string)
+    def __init__(self, endpoint, spec, dir, debug=False, *, stream=False, lazy_refs=False, url=None, profiler=None, max_depth=None, max_nodes=None, validator=None, dedup_schemas=False, spec_workers=1, spec_batch=None, digest=None):
+        """
+        spec is either the parsed spec (see Preprocessor.fix), a StreamedSpec (see Preprocessor.stream)
+        or a spec string. max_depth and max_nodes limit the schema trees, dedup_schemas links
+        duplicate schemas, see OpenAPIModel.
+        a parsed spec is validated by validator (see SpecValidator, strict by default), its
+        outcome is cached by digest (see SpecValidator.digest()).
 
-        if debug:
-            import json
-            import os
-            with open(os.path.join(dir, 'processed_' + endpoint), 'w') as fp:
-                json.dump(parser.specification, fp)
+        a StreamedSpec is neither validated nor resolved, it would have to be loaded as a whole.
+        its $ref are followed by the model, as with lazy_refs
+
+        with spec_workers > 1 the top level schemas and path items are walked in batches of
+        spec_batch by that many processes, see PartitionedWalk
+
+        the options after debug are keyword only, there are too many to tell apart by position
+        """
+        from parser.streaming import StreamedSpec
+
+        self._profiler = profiler or Profiler()
+        self._validation = None
+
+        if isinstance(spec, StreamedSpec):
+            logger.info(f'[INFO] {endpoint} is streamed, validation skipped')
+            lazy_refs = True
+            specification = spec
+        else:
+            with self._profiler.stage('parse'):
+                if not isinstance(spec, str):
+                    parser, self._validation = (validator or SpecValidator()).parse(spec, url or endpoint, lazy_refs, digest)
+                elif lazy_refs:
+                    parser = BaseParser(spec_string=spec)
+                else:
+                    parser = ResolvingParser(spec_string=spec)
+
+            if self._validation:
+                with self._profiler.stage('validate'):
+                    self._validation.start()
+
+            specification = parser.specification
+
+            if debug:
+                import json
+                import os
+                from parser.discovery import flat
+                with open(os.path.join(dir, 'processed_' + flat(endpoint)), 'w') as fp:
+                    json.dump(specification, fp)
 
         self._dir = dir
-        self._model = OpenAPIModel()
-        self._model.build(endpoint, parser.specification)
+        self._endpoint = endpoint
+        self._spec = specification
+        # prance leaves the given spec as it is, with its $ref to link operations to schemas
+        self._refspec = None if isinstance(spec, str) else spec
+        self._model = OpenAPIModel(lazy_refs, max_depth, max_nodes, dedup_schemas)
+        self._partition = None
+
+        if spec_workers > 1:
+            from parser.partition import PartitionedWalk, PARTITION_BATCH_SIZE
+
+            if isinstance(spec, StreamedSpec):
+                # the workers would share the file position of the index
+                logger.info(f'[INFO] {endpoint} is streamed, walked by one process')
+            elif dedup_schemas:
+                # duplicates are linked to the first schema of the whole walk
+                logger.info(f'[INFO] schemas of {endpoint} deduplicated, walked by one process')
+            else:
+                self._partition = PartitionedWalk(self._model, spec_workers, spec_batch or PARTITION_BATCH_SIZE)
+
+        # in stream mode the model is walked by convert() and never held in memory as a whole
+        self._stream = stream
+
+        if not stream:
+            self.build()
+
+    def build(self):
+        """ build the whole model (done by the constructor unless in stream mode) """
+        with self._profiler.stage('build'):
+            self._model.build(self._endpoint, self._spec, self._refspec, self.walk())
+
+        self.validated()
+        self._stream = False
+        self._profiler.count(
+            schemas=len(self._model.schemas),
+            properties=len(self._model.properties),
+            paths=len(self._model.paths),
+            operations=len(self._model.operations),
+            links=len(self._model.associations),
+            truncated=len(self._model.truncated)
+        )
     
+    def walk(self):
+        """ the items of the walk of the model, split across processes with spec_workers """
+        if self._partition:
+            return self._partition.walk(self._endpoint, self._spec, self._refspec)
+
+        return self._model.walk(self._endpoint, self._spec, self._refspec)
+
+    def validated(self):
+        """ wait for a validation running next to the build (parallel mode), raises if the spec is invalid """
+        if self._validation:
+            with self._profiler.stage('validate'):
+                self._validation.check()
+
     def convert_objects(self, force=False):
         """ create objects.csv """
         import os
@@ -44,30 +145,10 @@ class OpenAPIParser():
 
         tmp_file = os.path.abspath(self._dir) + '/objects.csv.' + uuid.uuid4().hex.upper()[0:6]
 
-        with open(tmp_file, 'w', encoding='UTF8', newline='') as f:
-            writer = csv.DictWriter(f, self._model.object_csv_header.keys())
-            writer.writeheader()
-
-            if self._model.endpoint:
-                writer.writerow(self._model.endpoint.build())
-            
-            if self._model.info:
-                writer.writerow(self._model.info.build())
-
-            if self._model.externalDocs:
-                 writer.writerow(self._model.externalDocs.build())
-            
-            for schema in self._model.schemas:
-                writer.writerow(schema.build())
-            
-            for prop in self._model.properties:
-                writer.writerow(prop.build())
-            
-            for pathitem in self._model.paths:
-                writer.writerow(pathitem.build())
-            
-            for operation in self._model.operations:
-                writer.writerow(operation.build())
+        with self._profiler.stage('convert_objects'), open(tmp_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self._model.object_csv_header.keys())
+            self._profiler.count(object_rows=write_batched(writer, self.object_rows()))
 
         if os.path.exists(tmp_file):
             os.rename(tmp_file, os.path.abspath(self._dir) + '/objects.csv')
@@ -84,41 +165,158 @@ class OpenAPIParser():
         import csv
         import uuid
         import os
-        import copy
 
         tmp_file = os.path.abspath(self._dir) + '/links.csv.' + uuid.uuid4().hex.upper()[0:6]
 
-        with open(tmp_file, 'w', encoding='UTF8', newline='') as f:
-            writer = csv.DictWriter(f, self._model.link_csv_header.keys())
-            writer.writeheader()
-
-            for associationname, associationval in self._model.associations.items():
-                for entry in associationval:
-                    association = copy.deepcopy(self._model.link_csv_header)
-                    association['association'] = associationname
-                    association['fromObjectIdentity'] = entry['fromObjectIdentity']
-                    association['toObjectIdentity'] = entry['toObjectIdentity']
-                    writer.writerow(association)
-         
+        with self._profiler.stage('convert_links'), open(tmp_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self._model.link_csv_header.keys())
+            self._profiler.count(link_rows=write_batched(writer, self.link_rows()))
+
         if os.path.exists(tmp_file):
             os.rename(tmp_file, os.path.abspath(self._dir) + '/links.csv')
     
+    def convert(self, force=False):
+        """ create objects.csv and links.csv in one pass while the model is walked """
+        import os
+        assert os.path.exists(self._dir), "given dir not found: " + str(self._dir)
+
+        if not force:
+            assert os.path.exists(self._dir + '/objects.csv') == False, "objects.csv exists in: " + str(self._dir)
+            assert os.path.exists(self._dir + '/links.csv') == False, "links.csv exists in: " + str(self._dir)
+
+        """ create tmp files """
+        import csv
+        import uuid
+        from parser.output import MergedWriter
+
+        suffix = uuid.uuid4().hex.upper()[0:6]
+        tmp_objects = os.path.abspath(self._dir) + '/objects.csv.' + suffix
+        tmp_links = os.path.abspath(self._dir) + '/links.csv.' + suffix
+
+        with self._profiler.stage('convert'), open(tmp_objects, 'w', encoding='UTF8', newline='') as fo, open(tmp_links, 'w', encoding='UTF8', newline='') as fl:
+            files = MergedWriter(csv.writer(fo), csv.writer(fl))
+            object_count, link_count = self._write(files)
+            # links.csv has its header even without links
+            files.write_links(self._model.link_csv_header.keys(), [])
+
+        self._profiler.count(object_rows=object_count, link_rows=link_count, truncated=len(self._model.truncated))
+        self.validated()
+
+        os.rename(tmp_objects, os.path.abspath(self._dir) + '/objects.csv')
+        os.rename(tmp_links, os.path.abspath(self._dir) + '/links.csv')
+
+    def write(self, writer):
+        """
+        hand all object and link rows to writer (see parser.output), in batches of
+        ROW_BATCH_SIZE. the model is walked in stream mode, otherwise the built lists are used
+        """
+        walked = self._stream
+
+        with self._profiler.stage('write'):
+            object_count, link_count = self._write(writer)
+
+        self._profiler.count(object_rows=object_count, link_rows=link_count)
+
+        if walked:
+            self._profiler.count(truncated=len(self._model.truncated))
+            self.validated()
+
+    def _write(self, writer):
+        object_header = self._model.object_csv_header.keys()
+        link_header = self._model.link_csv_header.keys()
+        object_count = 0
+        link_count = 0
+
+        if not self._stream:
+            for batch in batches(self.object_rows()):
+                writer.write_objects(object_header, batch)
+                object_count += len(batch)
+
+            for batch in batches(self.link_rows()):
+                writer.write_links(link_header, batch)
+                link_count += len(batch)
+
+            return object_count, link_count
+
+        # objects and links come mixed from the walk, each kind is batched on its own
+        objects = []
+        links = []
+
+        for item in self.walk():
+            if type(item) == tuple:
+                links.append(item)
+                link_count += 1
+
+                if len(links) >= ROW_BATCH_SIZE:
+                    writer.write_links(link_header, links)
+                    links = []
+                continue
+
+            objects.append(item.row())
+            object_count += 1
+
+            if len(objects) >= ROW_BATCH_SIZE:
+                # the header is only known once the endpoint has been walked
+                writer.write_objects(self._model.object_csv_header.keys(), objects)
+                objects = []
+
+        if objects:
+            writer.write_objects(self._model.object_csv_header.keys(), objects)
+
+        if links:
+            writer.write_links(link_header, links)
+
+        return object_count, link_count
+
+    def object_rows(self):
+        """ positional object rows in the order of objects.csv """
+        if self._model.endpoint:
+            yield self._model.endpoint.row()
+
+        if self._model.info:
+            yield self._model.info.row()
+
+        if self._model.externalDocs:
+            yield self._model.externalDocs.row()
+
+        for schema in self._model.schemas:
+            yield schema.row()
+
+        for prop in self._model.properties:
+            yield prop.row()
+
+        for pathitem in self._model.paths:
+            yield pathitem.row()
+
+        for operation in self._model.operations:
+            yield operation.row()
+
+    def link_rows(self):
+        """ positional link rows (association, fromObjectIdentity, toObjectIdentity) """
+        return self._model.associations.rows()
+
     def zip_metadata(self):
-        from zipfile import ZipFile
-        zipMetadata = ZipFile(self._dir +  '/metadata.zip', 'w')
+        zip_metadata(self._dir)
 
-        import os
-        from os.path import basename
+def zip_metadata(dir, compresslevel=None):
+    """ pack objects.csv and links.csv of the given dir into metadata.zip, deflated if a compresslevel is given """
+    import os
+    from os.path import basename
+    from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
 
-        path = self._dir + '/objects.csv'
+    compression = ZIP_STORED if compresslevel is None else ZIP_DEFLATED
+
+    with ZipFile(dir +  '/metadata.zip', 'w', compression=compression, compresslevel=compresslevel) as zipMetadata:
+        path = dir + '/objects.csv'
 
         if os.path.exists(path):
             zipMetadata.write(path, basename(path))
-        
-        path = self._dir + '/links.csv'
-        
+
+        path = dir + '/links.csv'
+
         if os.path.exists(path):
             zipMetadata.write(path, basename(path))
             return
-        
-        logger.info('[... zip objects.csv or links.csv failed ...]')
+
+    logger.info('[... zip objects.csv or links.csv failed ...]')
@@ -0,0 +1,443 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# rows handed to a writer (csv.writer.writerows, a shard writer thread, ...) at once
+ROW_BATCH_SIZE = 1000
+
+def batches(rows, size=ROW_BATCH_SIZE):
+    """ the rows of an iterable in lists of size (the last one shorter) """
+    from itertools import islice
+
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+class RowBuffer():
+    """
+    object and link rows of one spec kept in memory, with the writer interface of
+    MetadataZip (see OpenAPIParser.write). it is picklable, so workers can return it
+    """
+    def __init__(self):
+        self._object_header = None
+        self._link_header = None
+        self._objects = []
+        self._links = []
+
+    def write_objects(self, header, rows):
+        self._object_header = tuple(header)
+        self._objects.extend(rows)
+
+    def write_links(self, header, rows):
+        self._link_header = tuple(header)
+        self._links.extend(rows)
+
+    def replay(self, writer):
+        """ hand the buffered rows to another writer """
+        if self._object_header:
+            writer.write_objects(self._object_header, self._objects)
+
+        if self._link_header:
+            writer.write_links(self._link_header, self._links)
+
+    def save(self, objectfile, linkfile):
+        """ write the rows as objects/links csv files """
+        import csv
+
+        with open(objectfile, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self._object_header)
+            writer.writerows(self._objects)
+
+        with open(linkfile, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self._link_header)
+            writer.writerows(self._links)
+
+    @staticmethod
+    def load(objectfile, linkfile):
+        """ read rows written by save() or convert_objects()/convert_links() """
+        import csv
+        rows = RowBuffer()
+
+        with open(objectfile, encoding='UTF8', newline='') as f:
+            reader = csv.reader(f)
+            rows.write_objects(next(reader), reader)
+
+        with open(linkfile, encoding='UTF8', newline='') as f:
+            reader = csv.reader(f)
+            rows.write_links(next(reader), reader)
+
+        return rows
+
+class _Lines():
+    """
+    a file taking csv text with the line endings of the merged csv files, which merge_csv()
+    reads and writes in text mode: \r\n and \r, also within values, become os.linesep. the
+    rows are written as to the csv files of a spec, with \r\n (a value with \r is quoted)
+    """
+    def __init__(self, f):
+        import os
+        self._f = f
+        self._linesep = os.linesep
+
+    def write(self, text):
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        if self._linesep != '\n':
+            text = text.replace('\n', self._linesep)
+
+        return self._f.write(text)
+
+class MergedWriter():
+    """ writes the rows of all specs (or of one, see OpenAPIParser.convert) to one object and one link csv writer, the header once """
+    def __init__(self, object_writer, link_writer):
+        self._object_writer = object_writer
+        self._link_writer = link_writer
+        self._object_header = None
+        self._link_header = None
+
+    def write_objects(self, header, rows):
+        header = tuple(header)
+
+        if self._object_header is None:
+            self._object_header = header
+            self._object_writer.writerow(header)
+        elif header != self._object_header:
+            logger.warning(f'[WARNING] object header mismatch {header}')
+
+        self._object_writer.writerows(rows)
+
+    def write_links(self, header, rows):
+        header = tuple(header)
+
+        if self._link_header is None:
+            self._link_header = header
+            self._link_writer.writerow(header)
+        elif header != self._link_header:
+            logger.warning(f'[WARNING] link header mismatch {header}')
+
+        self._link_writer.writerows(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class MetadataCSV(MergedWriter):
+    """
+    writes the merged objects.csv and links.csv into dir, the same files as merging the csv
+    files of every spec. they are written under temporary names and replace the old ones on
+    close(), so readers never see half written files
+    """
+    def __init__(self, dir):
+        import csv
+        import os
+        import uuid
+
+        suffix = uuid.uuid4().hex.upper()[0:6]
+        self._files = []
+
+        for name in ('objects.csv', 'links.csv'):
+            path = os.path.join(dir, name)
+            self._files.append((open(path + '.' + suffix, 'w', encoding='UTF8', newline=''), path))
+
+        super(MetadataCSV, self).__init__(
+            csv.writer(_Lines(self._files[0][0]), lineterminator='\r\n'),
+            csv.writer(_Lines(self._files[1][0]), lineterminator='\r\n')
+        )
+
+    def close(self):
+        import os
+
+        for f, path in self._files:
+            f.close()
+            os.replace(f.name, path)
+
+class MetadataZip(MergedWriter):
+    """
+    writes the merged objects.csv and links.csv straight into deflated entries of
+    metadata.zip, the header of each file once. a zip file can only write one entry at
+    a time, so the links are spooled to an anonymous temp file and copied into their
+    entry on close()
+    """
+    def __init__(self, path, compresslevel=6):
+        import csv
+        import io
+        import os
+        import tempfile
+        from zipfile import ZipFile, ZIP_DEFLATED
+
+        self._zip = ZipFile(path, 'w', compression=ZIP_DEFLATED, compresslevel=compresslevel)
+        # size is unknown up front, allow entries > 2GB
+        self._objects = io.TextIOWrapper(self._zip.open('objects.csv', 'w', force_zip64=True), encoding='UTF8', newline='')
+        self._links = tempfile.TemporaryFile('w+', encoding='UTF8', newline='', dir=os.path.dirname(os.path.abspath(path)))
+        # same line endings as the merged csv files, see _Lines
+        super(MetadataZip, self).__init__(
+            csv.writer(_Lines(self._objects), lineterminator='\r\n'),
+            csv.writer(_Lines(self._links), lineterminator='\r\n')
+        )
+
+    def close(self):
+        import io
+        import shutil
+
+        self._objects.close()
+
+        with io.TextIOWrapper(self._zip.open('links.csv', 'w', force_zip64=True), encoding='UTF8', newline='') as links:
+            self._links.seek(0)
+            shutil.copyfileobj(self._links, links, 1 << 20)
+
+        self._links.close()
+        self._zip.close()
+
+class ShardedOutput():
+    """
+    writes the merged rows into shards metadata-0001.zip, metadata-0002.zip, ... of dir, each
+    with its own objects.csv and links.csv, and describes them in dir/manifest.json.
+
+    a shard is closed once it holds max_rows rows or about max_bytes bytes of csv (objects and
+    links together). a link is only written once both of its objects are, into the same or a
+    later shard, so shards can be imported one after the other. links to objects that never
+    come (e.g. of other specs) go into the last shard.
+
+    every shard is compressed and written by its own thread, at most writers shards at a time.
+    the links of a spec come after its objects, link_header is the header of links.csv in
+    shards which are full before the first link
+    """
+    def __init__(self, dir, max_rows=None, max_bytes=None, compresslevel=6, writers=2, link_header=None):
+        import glob
+        import os
+        import threading
+
+        self._dir = dir
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._compresslevel = compresslevel
+        self._slots = threading.BoundedSemaphore(writers)
+        self._object_header = None
+        self._link_header = tuple(link_header) if link_header else None
+        self._identity = None
+        # identities of the objects written so far, '' is the resource root
+        self._written = {''}
+        # identity an unwritten link waits for -> links
+        self._pending = {}
+        self._shards = []
+        self._shard = None
+
+        for path in glob.glob(os.path.join(dir, 'metadata-*.zip')) + glob.glob(os.path.join(dir, 'manifest.json')):
+            os.unlink(path)
+
+    @property
+    def shards(self):
+        return self._shards
+
+    @property
+    def object_header(self):
+        return self._object_header
+
+    @property
+    def link_header(self):
+        return self._link_header
+
+    def write_objects(self, header, rows):
+        header = tuple(header)
+
+        if self._object_header is None:
+            self._object_header = header
+            self._identity = header.index('identity')
+        elif header != self._object_header:
+            logger.warning(f'[WARNING] object header mismatch {header}')
+
+        for row in rows:
+            shard = self.shard()
+            shard.add_object(row)
+            identity = row[self._identity]
+            self._written.add(identity)
+
+            for link in self._pending.pop(identity, ()):
+                self.add_link(link)
+
+    def write_links(self, header, rows):
+        header = tuple(header)
+
+        if self._link_header is None:
+            self._link_header = header
+        elif header != self._link_header:
+            logger.warning(f'[WARNING] link header mismatch {header}')
+
+        for row in rows:
+            self.add_link(row)
+
+    def add_link(self, row):
+        for identity in (row[1], row[2]):
+            if identity not in self._written:
+                self._pending.setdefault(identity, []).append(row)
+                return
+
+        self.shard().add_link(row)
+
+    def shard(self):
+        """ the shard to write to, a new one once the current is full """
+        shard = self._shard
+
+        if shard is not None and not shard.full(self._max_rows, self._max_bytes):
+            return shard
+
+        if shard is not None:
+            shard.close()
+
+        import os
+        path = os.path.join(self._dir, f'metadata-{len(self._shards) + 1:04d}.zip')
+        self._shard = _Shard(self, path, self._compresslevel, self._slots)
+        self._shards.append(self._shard)
+        return self._shard
+
+    def close(self):
+        import json
+        import os
+
+        # links to objects that never came
+        pending = [link for links in self._pending.values() for link in links]
+        self._pending = {}
+
+        for link in pending:
+            self.shard().add_link(link)
+
+        if self._shard is None:
+            self.shard()
+
+        self._shard.close()
+        manifest = {'max_rows': self._max_rows, 'max_bytes': self._max_bytes, 'objects': 0, 'links': 0, 'shards': []}
+
+        for shard in self._shards:
+            shard.join()
+            manifest['objects'] += shard.objects
+            manifest['links'] += shard.links
+            manifest['shards'].append({'file': os.path.basename(shard.path), 'objects': shard.objects, 'links': shard.links, 'bytes': shard.bytes})
+
+        with open(os.path.join(self._dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f'[INFO] {manifest["objects"]} objects and {manifest["links"]} links written to {len(self._shards)} shards')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _Shard():
+    """ rows of one shard, handed in batches to the thread writing its MetadataZip """
+    def __init__(self, output, path, compresslevel, slots):
+        import queue
+        import threading
+
+        self._output = output
+        self._path = path
+        self._objects = []
+        self._links = []
+        self._object_count = 0
+        self._link_count = 0
+        self._bytes = 0
+        self._error = None
+        self._slots = slots
+        self._slots.acquire()
+        self._queue = queue.Queue(maxsize=8)
+        self._thread = threading.Thread(target=self.run, args=(compresslevel,), daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def objects(self):
+        return self._object_count
+
+    @property
+    def links(self):
+        return self._link_count
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    @staticmethod
+    def size(row):
+        """ about the csv size of a row """
+        return sum(len(str(value)) for value in row) + len(row) + 1
+
+    def full(self, max_rows, max_bytes):
+        rows = self._object_count + self._link_count
+        return (max_rows is not None and rows >= max_rows) or (max_bytes is not None and self._bytes >= max_bytes)
+
+    def add_object(self, row):
+        self._objects.append(row)
+        self._object_count += 1
+        self._bytes += self.size(row)
+
+        if len(self._objects) >= ROW_BATCH_SIZE:
+            self.flush()
+
+    def add_link(self, row):
+        self._links.append(row)
+        self._link_count += 1
+        self._bytes += self.size(row)
+
+        if len(self._links) >= ROW_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._objects:
+            self._queue.put(('objects', self._output.object_header, self._objects))
+            self._objects = []
+
+        if self._links:
+            self._queue.put(('links', self._output.link_header, self._links))
+            self._links = []
+
+    def close(self):
+        """ hand the remaining rows to the thread, it finishes the shard on its own """
+        self.flush()
+        self._queue.put(('close', None, (self._output.object_header, self._output.link_header)))
+
+    def join(self):
+        self._thread.join()
+
+        if self._error:
+            raise self._error
+
+    def run(self, compresslevel):
+        try:
+            with MetadataZip(self._path, compresslevel) as metadata:
+                while True:
+                    kind, header, rows = self._queue.get()
+
+                    if kind == 'objects':
+                        metadata.write_objects(header, rows)
+                    elif kind == 'links':
+                        metadata.write_links(header, rows)
+                    else:
+                        # every shard gets both headers, even without rows of its own
+                        object_header, link_header = rows
+
+                        if object_header:
+                            metadata.write_objects(object_header, [])
+
+                        if link_header:
+                            metadata.write_links(link_header, [])
+                        break
+        except Exception as ex:
+            self._error = ex
+
+            # keep taking batches, the writing side would block on a full queue
+            while self._queue.get()[0] != 'close':
+                pass
+        finally:
+            self._slots.release()
@@ -0,0 +1,85 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+from model.model import Rendered
+
+# top level schemas (or path items) walked by one task, see PartitionedWalk
+PARTITION_BATCH_SIZE = 500
+
+# the model of the spec walked by this worker process, see _init()
+_model = None
+
+class PartitionedWalk():
+    """
+    the walk of one spec split across a pool of workers processes: the top level schemas and
+    then the path items are walked in batches of batch_size, each by one worker. the items of
+    the batches (objects as Rendered rows) are yielded in the order of OpenAPIModel.walk(), so the
+    output is the one of a serial walk.
+
+    the paths are walked once the locations of all schemas are indexed, by a second pool. with
+    fork the workers share the spec (and the reference index) with this process, otherwise
+    the model is pickled once per worker. a part of no more than batch_size entries is walked
+    here, without a pool
+    """
+    def __init__(self, model, workers, batch_size=PARTITION_BATCH_SIZE):
+        self._model = model
+        self._workers = workers
+        self._batch_size = batch_size
+
+    def walk(self, endpoint, spec, refspec=None):
+        model = self._model
+        yield from model.walk_head(endpoint, spec, refspec)
+
+        for items, references, truncated in self.batches('schemas', model.safe_get('components.schemas', spec)):
+            for location, (identity, isproperty) in references:
+                model.references.add(location, identity, isproperty)
+
+            model.truncated.extend(truncated)
+            yield from items
+
+        model.schemas_walked()
+
+        for items, _, _ in self.batches('paths', model.safe_get('paths', spec)):
+            yield from items
+
+    @staticmethod
+    def rendered(items):
+        """ the items of a batch with the rows of its objects as Rendered """
+        for item in items:
+            yield Rendered(item) if type(item) == list else item
+
+    def batches(self, kind, entries):
+        """ walk_batch() of every batch of the names of entries, in order """
+        from concurrent.futures import ProcessPoolExecutor
+
+        names = list(entries)
+
+        if len(names) <= self._batch_size:
+            model = self._model
+            yield (model.walk_schemas(names) if kind == 'schemas' else model.walk_paths(names)), [], []
+            return
+
+        batches = [names[start:start + self._batch_size] for start in range(0, len(names), self._batch_size)]
+        logger.info(f'[INFO] {len(names)} {kind} of {self._model.endpoint.id} walked in {len(batches)} batches by {self._workers} workers')
+
+        # the pool is started now, so its workers see the model as it is (e.g. the reference index for the paths)
+        with ProcessPoolExecutor(self._workers, mp_context=_context(), initializer=_init, initargs=(self._model,)) as pool:
+            for items, references, truncated in pool.map(_walk_batch, [kind] * len(batches), batches):
+                yield self.rendered(items), references, truncated
+
+def _context():
+    """ fork where available, the workers then share the spec without pickling it """
+    import multiprocessing
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+
+    return None
+
+def _init(model):
+    global _model
+    _model = model
+
+def _walk_batch(kind, names):
+    return _model.walk_batch(kind, names)
@@ -1,26 +1,75 @@
 import json, os
 
+from parser.profiling import Profiler
+
 class Preprocessor():
-    def __init__(self, filepath, processingdir):
+    def __init__(self, filepath, processingdir, rules=None, profiler=None):
         self._filepath = filepath
         self._dir = processingdir
-    
-    def fix(self):
-        with open(self._filepath) as f:
-            # 1) null value not allowed for description field
-            str_fix = self.fix_null_description(f.read())
-
-            # 2) avoid endless loop
-            return self.fix_endless_loop(str_fix)
-    
-    def fix_null_description(self, str):
-        str = str.replace('"description": null', '"description": ""')
-        str = str.replace('"description":null', '"description": ""')
-        return str
-    
-    def fix_endless_loop(self, str):
-        spec = json.loads(str)
+        self._profiler = profiler or Profiler()
+        # additional fixups, see register()
+        self._rules = list(rules) if rules else []
+
+    def register(self, rule):
+        """
+        add a fixup. a rule is called with the parsed spec (dict) after the built-in ones
+        and returns the (possibly replaced) spec
+        """
+        self._rules.append(rule)
+
+    def rules(self, break_loops=True):
+        # 1) null value not allowed for description field
+        rules = [self.fix_null_description]
+
+        # 2) avoid endless loop
+        if break_loops:
+            rules.append(self.fix_endless_loop)
+
+        return rules + self._rules
+
+    def fix(self, break_loops=True):
+        """ parse the spec once and apply all rules on the parsed dict """
+        with self._profiler.stage('read'):
+            with open(self._filepath) as f:
+                spec = json.load(f)
+
+        self._profiler.count(spec_bytes=os.path.getsize(self._filepath))
+
+        for rule in self.rules(break_loops):
+            with self._profiler.stage('rule:' + getattr(rule, '__name__', type(rule).__name__)):
+                spec = rule(spec)
+
+        return spec
+
+    def stream(self):
+        """
+        index the spec without loading it (see parser.streaming.StreamedSpec). only
+        fix_null_description applies, on every component when it is decoded
+        """
+        from parser.streaming import StreamedSpec
 
+        with self._profiler.stage('index'):
+            spec = StreamedSpec(self._filepath, self.fix_null_description)
+
+        self._profiler.count(spec_bytes=os.path.getsize(self._filepath))
+        return spec
+
+    def fix_null_description(self, spec):
+        stack = [spec]
+
+        while stack:
+            val = stack.pop()
+
+            if isinstance(val, dict):
+                if 'description' in val and val['description'] is None:
+                    val['description'] = ''
+                stack.extend(val.values())
+            elif isinstance(val, list):
+                stack.extend(val)
+
+        return spec
+
+    def fix_endless_loop(self, spec):
         if 'components' in spec:
             schemas = spec['components']['schemas']
 
@@ -31,12 +80,10 @@ class Preprocessor():
                     ref = val['properties']['extension']['items']['$ref']
 
                     if ref == '#/components/schemas/Extension':
-                        
+
                         spec['components']['schemas']['Extension']['properties']['extension']['items']['$ref'] = '#/components/schemas/Extension_ex'
                         spec['components']['schemas']['Extension_ex'] = {
                             'type': 'object',
                             'title': 'fake object to avoid Extension endless loop'
                         }
-        return json.dumps(spec)
-
-
+        return spec
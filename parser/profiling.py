@@ -0,0 +1,204 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Profiler():
+    """
+    wall time, cpu time and object/row counts per stage of one spec (or of the run when
+    spec is None), optionally with tracemalloc peak memory per stage and tracemalloc dumps,
+    and cProfile dumps per spec. a Profiler without dir records nothing.
+
+    tracemalloc is started by the first Profiler started in a process (the run, or a spec in
+    a worker) and stopped by that one, the profilers started meanwhile share it
+
+    every spec is saved to <dir>/specs/<spec>.json, so specs profiled in worker processes
+    end up in the same report, see write_report()
+    """
+    def __init__(self, dir=None, spec=None, memory=False, cprofile=False):
+        self._dir = dir
+        self._spec = spec
+        self._memory = memory
+        self._cprofile = cprofile
+        self._stages = {}
+        self._counts = {}
+        self._profile = None
+        # whether start() started tracemalloc, so stop() stops it
+        self._tracing = False
+
+    @staticmethod
+    def from_args(args, spec=None):
+        # cProfile per spec only, a second one in the process would take over from the one of the run
+        return Profiler(args.profile, spec, args.profile_memory, args.profile_cprofile and spec is not None)
+
+    @property
+    def enabled(self):
+        return self._dir is not None
+
+    @property
+    def stages(self):
+        return self._stages
+
+    @property
+    def counts(self):
+        return self._counts
+
+    def stage(self, name):
+        """
+        context manager timing the stage name, repeated stages add up. stages may be nested
+        (the stages of a spec scanned within the one of the run), the peak of a stage includes
+        the ones of the stages within
+        """
+        if not self.enabled:
+            import contextlib
+            return contextlib.nullcontext()
+
+        return _Stage(self, name)
+
+    def count(self, **counts):
+        if self.enabled:
+            for name, value in counts.items():
+                self._counts[name] = self._counts.get(name, 0) + value
+
+    def record(self, name, wall, cpu, peak):
+        stage = self._stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        stage['wall'] += wall
+        stage['cpu'] += cpu
+        stage['calls'] += 1
+
+        if peak is not None:
+            stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak)
+
+    def start(self):
+        """ start tracemalloc (unless it is tracing already) and cProfile, see stop() """
+        if not self.enabled:
+            return
+
+        if self._memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+
+        if self._cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        """ stop tracemalloc/cProfile, dump them next to the report and save the spec """
+        if not self.enabled:
+            return
+
+        import os
+        name = self.filename()
+        os.makedirs(os.path.join(self._dir, 'specs'), exist_ok=True)
+
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(os.path.join(self._dir, f'{name}.prof'))
+            self._profile = None
+
+        if self._memory:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                tracemalloc.take_snapshot().dump(os.path.join(self._dir, f'{name}.tracemalloc'))
+
+                if self._tracing:
+                    tracemalloc.stop()
+                    self._tracing = False
+
+        self.save()
+
+    def filename(self):
+        """ spec name usable as file name """
+        import os
+        return (self._spec or 'run').replace(os.sep, '__')
+
+    def report(self):
+        return {'spec': self._spec, 'stages': self._stages, 'counts': self._counts}
+
+    def save(self):
+        import json
+        import os
+
+        name = self.filename()
+
+        with open(os.path.join(self._dir, 'specs', f'{name}.json'), 'w') as f:
+            json.dump(self.report(), f)
+
+    def write_report(self, path=None):
+        """ collect all saved specs and the run into one json report (default <dir>/profile.json) """
+        if not self.enabled:
+            return
+
+        import json
+        import os
+        import platform
+        import time
+
+        specsdir = os.path.join(self._dir, 'specs')
+        report = {
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'run': self.report(),
+            'specs': {}
+        }
+
+        for file in sorted(os.listdir(specsdir)) if os.path.exists(specsdir) else []:
+            if file.endswith('.json') and file != 'run.json':
+                with open(os.path.join(specsdir, file)) as f:
+                    spec = json.load(f)
+                    report['specs'][spec['spec']] = spec
+
+        path = path or os.path.join(self._dir, 'profile.json')
+
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        logger.info(f'[INFO] profile written to {path}')
+
+# the _Stage objects entered and not exited yet in this process, outermost first
+_open = []
+
+class _Stage():
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+        self._start_memory = None
+        # the peak traced before a stage within this one reset it
+        self._peak = 0
+
+    def __enter__(self):
+        import time
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+
+            for stage in _open:
+                stage._peak = max(stage._peak, peak)
+
+            tracemalloc.reset_peak()
+            self._start_memory = tracemalloc.get_traced_memory()[0]
+
+        _open.append(self)
+
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        import time
+        import tracemalloc
+
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak = None
+        _open.remove(self)
+
+        if self._start_memory is not None and tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1]) - self._start_memory
+
+        self._profiler.record(self._name, wall, cpu, peak)
@@ -0,0 +1,173 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# parsed documents kept per process, see ReferenceCache
+REFERENCE_CACHE_SIZE = 128
+
+# the ReferenceCache of this process, see ReferenceCache.shared()
+_shared = None
+
+class ReferenceCache():
+    """
+    external documents of $ref (e.g. common/errors.json) as parsed by prance, shared by all
+    specs resolved in this process, the last size of them are kept. prance takes them as its
+    reference_cache, see scope().
+
+    a local document is only taken from the cache while its mtime and size are unchanged. with
+    dir, parsed documents are also pickled there, so the workers of a run share them
+    """
+    def __init__(self, size=REFERENCE_CACHE_SIZE, dir=None):
+        self._size = size
+        self._dir = dir
+        self._entries = {}
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def shared(size=REFERENCE_CACHE_SIZE, dir=None):
+        """ the ReferenceCache of this process, kept across specs (and runs in a worker) """
+        global _shared
+
+        if _shared is None or (_shared.size, _shared.dir) != (size, dir):
+            _shared = ReferenceCache(size, dir)
+
+        return _shared
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def dir(self):
+        return self._dir
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def __len__(self):
+        return len(self._entries)
+
+    def scope(self, url, strict=True):
+        """ the reference_cache of a RefResolver of the spec at url, see _Scope """
+        from prance.util.url import absurl, urlresource
+        return _Scope(self, (urlresource(absurl(url)), strict))
+
+    @staticmethod
+    def stamp(resource):
+        """ (mtime, size) of a local document, None for other urls and missing files """
+        from urllib.parse import urlsplit
+        from urllib.request import url2pathname
+
+        parts = urlsplit(resource)
+
+        if parts.scheme not in ('', 'file'):
+            return None
+
+        try:
+            stat = os.stat(url2pathname(parts.path))
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, key, stamp):
+        """ the parsed document of key as of stamp, None if it is not cached """
+        entry = self._entries.pop(key, None)
+
+        if entry is not None and entry[0] == stamp:
+            self._entries[key] = entry
+            self._stats['hits'] += 1
+            return entry[1]
+
+        value = self.load(key, stamp)
+
+        if value is None:
+            self._stats['misses'] += 1
+            return None
+
+        self._stats['hits'] += 1
+        self.add(key, stamp, value)
+        return value
+
+    def put(self, key, stamp, value):
+        self.add(key, stamp, value)
+        self.save(key, stamp, value)
+
+    def add(self, key, stamp, value):
+        self._entries[key] = (stamp, value)
+
+        while len(self._entries) > self._size:
+            del self._entries[next(iter(self._entries))]
+
+    def path(self, key, stamp):
+        import hashlib
+        return os.path.join(self._dir, hashlib.sha1(repr((key, stamp)).encode()).hexdigest() + '.pickle')
+
+    def load(self, key, stamp):
+        import pickle
+
+        if not self._dir:
+            return None
+
+        try:
+            with open(self.path(key, stamp), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def save(self, key, stamp, value):
+        """ pickle a parsed document for the other workers, written under a temp name first """
+        import pickle
+        import uuid
+
+        if not self._dir:
+            return
+
+        path = self.path(key, stamp)
+        tmp = path + '.' + uuid.uuid4().hex.upper()[0:6]
+
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tmp, path)
+        except (OSError, pickle.PicklingError) as ex:
+            logger.warning(f'[WARNING] could not share the parsed {key[0]}: {ex}')
+
+class _Scope():
+    """
+    the view of a ReferenceCache handed to prance while one spec is resolved. prance looks
+    documents up by (url, strict), it also registers the spec being resolved, which stays in
+    the scope. the stamp of a document is taken once per spec
+    """
+    def __init__(self, cache, own):
+        self._cache = cache
+        self._own = own
+        self._local = {}
+        self._stamps = {}
+
+    def stamp(self, resource):
+        if resource not in self._stamps:
+            self._stamps[resource] = self._cache.stamp(resource)
+
+        return self._stamps[resource]
+
+    def get(self, key, default=None):
+        if key in self._local:
+            return self._local[key]
+
+        if not isinstance(key, tuple):
+            return default
+
+        value = self._cache.get(key, self.stamp(key[0]))
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        if key == self._own:
+            self._local[key] = value
+        elif isinstance(key, tuple):
+            self._cache.put(key, self.stamp(key[0]), value)
+
+        # the text of a document ('text_' + url) is parsed right away, it is not kept
@@ -0,0 +1,158 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# layout of the tables below, a store of another layout is emptied
+STORE_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS headers (kind TEXT PRIMARY KEY, header TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS specs (spec TEXT PRIMARY KEY, position INTEGER, scanned REAL);
+CREATE TABLE IF NOT EXISTS objects (spec TEXT NOT NULL, seq INTEGER NOT NULL, class TEXT, identity TEXT, name TEXT, row TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS links (spec TEXT NOT NULL, seq INTEGER NOT NULL, association TEXT, source TEXT, target TEXT);
+CREATE INDEX IF NOT EXISTS objects_spec ON objects (spec, seq);
+CREATE INDEX IF NOT EXISTS objects_identity ON objects (identity);
+CREATE INDEX IF NOT EXISTS objects_class ON objects (class);
+CREATE INDEX IF NOT EXISTS links_spec ON links (spec, seq);
+CREATE INDEX IF NOT EXISTS links_source ON links (source);
+CREATE INDEX IF NOT EXISTS links_target ON links (target);
+CREATE INDEX IF NOT EXISTS links_association ON links (association);
+'''
+
+class MetadataStore():
+    """
+    object and link rows of every scanned spec in a sqlite file, with the writer interface of
+    MetadataZip for the rows of one spec (see put()). the merged output is rendered from it
+    with one query per file (see render()), without scanning again.
+
+    objects keep their whole row (json) next to the class, identity and name columns, links
+    their association and both identities, so the catalog can be queried directly, e.g.
+    SELECT class, count(*) FROM objects GROUP BY class
+    """
+    def __init__(self, path):
+        import sqlite3
+
+        self._path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+
+        if version not in (0, STORE_VERSION):
+            logger.warning(f'[WARNING] {path} has layout {version}, emptied for layout {STORE_VERSION}')
+
+            with self._db:
+                for table in ('headers', 'specs', 'objects', 'links'):
+                    self._db.execute(f'DROP TABLE IF EXISTS {table}')
+
+        self._db.executescript(SCHEMA)
+        self._db.execute(f'PRAGMA user_version={STORE_VERSION}')
+        self._spec = None
+        self._seq = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    def header(self, kind):
+        row = self._db.execute('SELECT header FROM headers WHERE kind = ?', (kind,)).fetchone()
+        return tuple(json.loads(row[0])) if row else None
+
+    def set_header(self, kind, header):
+        header = tuple(header)
+        stored = self.header(kind)
+
+        if stored is None:
+            self._db.execute('INSERT INTO headers VALUES (?, ?)', (kind, json.dumps(header)))
+        elif stored != header:
+            logger.warning(f'[WARNING] {kind} header mismatch {header}')
+
+        return header
+
+    def write_objects(self, header, rows):
+        header = self.set_header('objects', header)
+        columns = [header.index(column) if column in header else None for column in ('class', 'identity', 'core.name')]
+
+        def values():
+            for row in rows:
+                self._seq += 1
+                yield (self._spec, self._seq, *(row[c] if c is not None else None for c in columns), json.dumps(row))
+
+        self._db.executemany('INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)', values())
+
+    def write_links(self, header, rows):
+        self.set_header('links', header)
+
+        def values():
+            for row in rows:
+                self._seq += 1
+                yield (self._spec, self._seq, *row[0:3])
+
+        self._db.executemany('INSERT INTO links VALUES (?, ?, ?, ?, ?)', values())
+
+    def put(self, spec_json, rows):
+        """ replace the rows of spec_json by rows (e.g. a RowBuffer), in one transaction """
+        import time
+
+        with self._db:
+            self._delete(spec_json)
+            self._spec = spec_json
+            self._seq = 0
+            rows.replay(self)
+            self._db.execute('INSERT INTO specs VALUES (?, (SELECT count(*) FROM specs), ?)', (spec_json, time.time()))
+            self._spec = None
+
+    def _delete(self, spec_json):
+        for table in ('objects', 'links', 'specs'):
+            self._db.execute(f'DELETE FROM {table} WHERE spec = ?', (spec_json,))
+
+    def delete(self, spec_json):
+        with self._db:
+            self._delete(spec_json)
+
+    def specs(self):
+        """ the stored specs, in render order """
+        return [spec for spec, in self._db.execute('SELECT spec FROM specs ORDER BY position')]
+
+    def sync(self, spec_jsons):
+        """ keep the specs of spec_jsons only and render them in that order """
+        with self._db:
+            for spec_json in set(self.specs()) - set(spec_jsons):
+                self._delete(spec_json)
+
+            self._db.executemany('UPDATE specs SET position = ? WHERE spec = ?', enumerate(spec_jsons))
+
+    def counts(self):
+        return {table: self._db.execute(f'SELECT count(*) FROM {table}').fetchone()[0] for table in ('specs', 'objects', 'links')}
+
+    def render(self, writer, dedup=False):
+        """
+        hand the rows of all specs to writer (e.g. MetadataCSV), spec by spec in render order.
+        with dedup only the first object of every identity and the first of equal links are kept
+        """
+        objects = 'SELECT row, identity, position, seq FROM objects JOIN specs USING (spec)'
+        links = 'SELECT association, source, target, position, seq FROM links JOIN specs USING (spec)'
+
+        if dedup:
+            objects = f'SELECT row, identity, position, seq FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY identity ORDER BY position, seq) AS n FROM ({objects})) WHERE n = 1'
+            links = f'SELECT association, source, target, position, seq FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY association, source, target ORDER BY position, seq) AS n FROM ({links})) WHERE n = 1'
+
+        header = self.header('objects')
+
+        if header:
+            writer.write_objects(header, (json.loads(row) for row, *_ in self._db.execute(objects + ' ORDER BY position, seq')))
+
+        header = self.header('links')
+
+        if header:
+            writer.write_links(header, (row[0:3] for row in self._db.execute(links + ' ORDER BY position, seq')))
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,228 @@
+import json
+import re
+
+# bytes decoded at once when looking for the end of a value, doubled until it fits
+CHUNK_SIZE = 1 << 12
+# object levels indexed member by member: the spec, its sections (components, paths, ...),
+# their entries. deeper values (e.g. one schema, one path item operation) are decoded whole
+INDEX_DEPTH = 3
+# decoded values kept for repeated access, e.g. a schema referenced by many others
+CACHE_SIZE = 64
+
+_whitespace = re.compile(rb'[ \t\n\r]*')
+_string = re.compile(rb'"(?:[^"\\]|\\.)*"')
+
+class StreamedSpec(dict):
+    """
+    read-only view of a json spec file that is never loaded as a whole.
+
+    the file is memory mapped and its outer objects are indexed once, keeping only the byte
+    extents of their members (e.g. every entry of components.schemas and of paths). a member
+    is decoded when it is accessed and only the last CACHE_SIZE of them are kept, so memory
+    grows with the largest component rather than with the spec.
+
+    it is a dict to the model (get, items, in, ...), fixup is applied to every decoded member
+    wrapped as {key: value}. the underlying dict stays empty, so json.dump sees {}
+    """
+    def __init__(self, path, fixup=None, reader=None, members=None):
+        super(StreamedSpec, self).__init__()
+
+        if reader is None:
+            reader = _Reader(path, fixup)
+            members, _ = reader.index(0, 0)
+
+        self._reader = reader
+        self._members = members
+
+    @property
+    def reader(self):
+        return self._reader
+
+    def close(self):
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _value(self, key):
+        member = self._members[key]
+
+        if isinstance(member, StreamedSpec):
+            return member
+
+        return self._reader.load(key, *member)
+
+    def __getitem__(self, key):
+        return self._value(key)
+
+    def get(self, key, default=None):
+        if key not in self._members:
+            return default
+
+        return self._value(key)
+
+    def __contains__(self, key):
+        return key in self._members
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def __len__(self):
+        return len(self._members)
+
+    def keys(self):
+        return self._members.keys()
+
+    def items(self):
+        for key in self._members:
+            yield key, self._value(key)
+
+    def values(self):
+        for key in self._members:
+            yield self._value(key)
+
+    def __repr__(self):
+        return f'StreamedSpec({list(self._members)})'
+
+class _Reader():
+    def __init__(self, path, fixup=None):
+        import mmap
+
+        self._file = open(path, 'rb')
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'{path} is empty')
+
+        self._fixup = fixup
+        self._decoder = json.JSONDecoder()
+        self._cache = {}
+
+    @property
+    def size(self):
+        return len(self._map)
+
+    def close(self):
+        self._cache.clear()
+        self._map.close()
+        self._file.close()
+
+    def skip(self, pos):
+        return _whitespace.match(self._map, pos).end()
+
+    def expect(self, pos, char):
+        pos = self.skip(pos)
+
+        if self._map[pos:pos + 1] != char:
+            raise ValueError(f'expected {char.decode()} at byte {pos}')
+
+        return pos + 1
+
+    def key(self, pos):
+        """ the member name starting at pos and the position after it """
+        pos = self.skip(pos)
+        match = _string.match(self._map, pos)
+
+        if not match:
+            raise ValueError(f'expected a key at byte {pos}')
+
+        return json.loads(match.group(0)), match.end()
+
+    def decode(self, pos):
+        """ the value starting at pos and the position after it """
+        pos = self.skip(pos)
+        size = CHUNK_SIZE
+
+        while True:
+            data = self._map[pos:pos + size]
+            eof = pos + size >= len(self._map)
+
+            if not eof:
+                data = _complete(data)
+
+            text = data.decode('utf-8')
+
+            try:
+                value, end = self._decoder.raw_decode(text)
+
+                # a value ending right at the cut might go on (e.g. a number)
+                if end < len(text) or eof:
+                    return value, pos + (end if text.isascii() else len(text[:end].encode('utf-8')))
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+            size *= 2
+
+    def index(self, pos, level):
+        """
+        byte extents of the members of the object at pos, objects above INDEX_DEPTH are indexed
+        in turn. returns the members and the position after the object
+        """
+        members = {}
+        pos = self.skip(self.expect(pos, b'{'))
+
+        if self._map[pos:pos + 1] == b'}':
+            return members, pos + 1
+
+        while True:
+            key, pos = self.key(pos)
+            pos = self.skip(self.expect(pos, b':'))
+
+            if level + 1 < INDEX_DEPTH and self._map[pos:pos + 1] == b'{':
+                submembers, pos = self.index(pos, level + 1)
+                members[key] = StreamedSpec(None, reader=self, members=submembers)
+            else:
+                # decoded only to find its end, the value is dropped right away
+                _, end = self.decode(pos)
+                members[key] = (pos, end)
+                pos = end
+
+            pos = self.skip(pos)
+            char = self._map[pos:pos + 1]
+
+            if char == b'}':
+                return members, pos + 1
+
+            if char != b',':
+                raise ValueError(f'expected , or }} at byte {pos}')
+
+            pos += 1
+
+    def load(self, key, start, end):
+        """ the decoded member at start..end, the least recently used ones are dropped """
+        if start in self._cache:
+            value = self._cache.pop(start)
+            self._cache[start] = value
+            return value
+
+        value = json.loads(self._map[start:end])
+
+        if self._fixup:
+            value = self._fixup({key: value})[key]
+
+        if len(self._cache) >= CACHE_SIZE:
+            del self._cache[next(iter(self._cache))]
+
+        self._cache[start] = value
+        return value
+
+def _complete(data):
+    """ data without a trailing incomplete utf-8 sequence """
+    for cut in range(1, min(4, len(data)) + 1):
+        byte = data[-cut]
+
+        if byte < 0x80:
+            return data
+
+        if byte >= 0xC0:
+            # lead byte of a sequence of 2, 3 or 4 bytes
+            length = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return data if length == cut else data[:-cut]
+
+    return data
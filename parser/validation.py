@@ -0,0 +1,298 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# see SpecValidator
+VALIDATION_MODES = ('strict', 'parallel', 'lenient', 'skip')
+
+# options of a ResolvingParser handed on to its RefResolver
+RESOLVER_OPTIONS = ('encoding', 'recursion_limit', 'recursion_limit_handler', 'resolve_types', 'resolve_method', 'strict')
+
+class SpecValidator():
+    """
+    validates parsed specs with a prance backend (None: the default one of prance), in one of
+    VALIDATION_MODES:
+
+    strict    validate before the model is built, an invalid spec fails
+    parallel  build the model while the spec is validated in a forked process, an invalid spec
+              still fails once both are done
+    lenient   validate before the model is built, an invalid spec is only logged
+    skip      no validation, $ref are still resolved (unless lazy_refs)
+
+    with a cache dir the outcome is kept by the content hash of the spec file and of the
+    documents it refers to (see digest()), backend and prance version, a spec validated
+    before is not validated again. referenced documents are parsed once for all specs
+    sharing them, see ReferenceCache
+    """
+    def __init__(self, mode='strict', backend=None, cache=None, references=None):
+        import os
+
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f'validation mode may only be one of {VALIDATION_MODES}')
+
+        if cache:
+            os.makedirs(cache, exist_ok=True)
+
+        self._mode = mode
+        self._backend = backend
+        self._cache = cache
+        self._references = references
+
+    @staticmethod
+    def from_args(args):
+        from parser.references import ReferenceCache
+
+        references = None
+
+        if args.ref_cache_size > 0:
+            references = ReferenceCache.shared(args.ref_cache_size, getattr(args, 'reference_dir', None))
+
+        return SpecValidator(args.validation, args.validation_backend, args.validation_cache, references)
+
+    @property
+    def mode(self):
+        return self._mode
+
+    def digest(self, spec_path):
+        """
+        content hash of the spec file and the documents it refers to, with the scanner version
+        (the spec is preprocessed before it is validated). None without cache or if the spec
+        refers to a remote document, see ScanCache.documents()
+        """
+        import hashlib
+        import os
+        from parser.cache import ScanCache
+
+        if not self._cache:
+            return None
+
+        documents = ScanCache.documents(spec_path)
+
+        if documents is None:
+            return None
+
+        digest = hashlib.sha256(ScanCache.scanner_version().encode())
+
+        # by path relative to the spec, hashes of the same documents elsewhere are equal
+        for path, value in sorted((os.path.relpath(path, os.path.dirname(os.path.abspath(spec_path))), value) for path, value in documents.items()):
+            digest.update(f'{path}={value}'.encode() + b'\0')
+
+        return digest.hexdigest()
+
+    def parse(self, spec, url, lazy_refs=False, digest=None, **options):
+        """
+        a prance parser of the parsed spec, its specification resolved unless lazy_refs, and
+        the Validation of it to start() before and check() after the model is built. the
+        outcome is cached by digest (see digest()), which the caller takes of the spec file
+        """
+        from prance import BaseParser, ResolvingParser
+
+        if self._backend:
+            options['backend'] = self._backend
+
+        if lazy_refs:
+            # validate only, $ref are followed by the model where needed
+            parser = BaseParser(url=url, lazy=True, **options)
+        else:
+            parser = ResolvingParser(url=url, lazy=True, **options)
+
+        # what parse() does once the file has been loaded
+        parser.specification = spec
+
+        if not lazy_refs:
+            resolve(parser, self._references)
+
+        return parser, Validation(self, parser, digest, url, lazy_refs)
+
+    def key(self, digest, backend, lazy_refs):
+        """ cache key of the validation of the spec of digest, None without cache or digest """
+        import hashlib
+        import prance
+
+        if not self._cache or digest is None:
+            return None
+
+        digest = hashlib.sha256(digest.encode())
+
+        for part in (backend, prance.__version__, 'lazy' if lazy_refs else 'resolved'):
+            digest.update(b'\0')
+            digest.update(part.encode())
+
+        return digest.hexdigest()
+
+    def cached(self, key):
+        """ {'valid': ..., 'error': ...} of an earlier validation, None if there is none """
+        import json
+        import os
+
+        if key is None:
+            return None
+
+        try:
+            with open(os.path.join(self._cache, key + '.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, error):
+        """ keep the outcome of a validation, workers may store the same key """
+        import json
+        import os
+        import time
+        import uuid
+
+        if key is None:
+            return
+
+        path = os.path.join(self._cache, key + '.json')
+        tmp = path + '.' + uuid.uuid4().hex.upper()[0:6]
+
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'valid': error is None, 'error': error, 'validated': time.time()}, f)
+
+            os.replace(tmp, path)
+        except OSError as ex:
+            logger.warning(f'[WARNING] could not cache the validation of {key}: {ex}')
+
+class Validation():
+    """ the validation of one spec, see SpecValidator.parse() """
+    def __init__(self, validator, parser, digest, url, lazy_refs):
+        self._validator = validator
+        self._parser = parser
+        self._digest = digest
+        self._url = url
+        self._lazy_refs = lazy_refs
+        self._key = None
+        self._pending = None
+
+    def start(self):
+        """ validate, or start validating in the background in parallel mode """
+        from prance import ValidationError
+
+        if self._validator.mode == 'skip':
+            return
+
+        self._key = self._validator.key(self._digest, self._parser.backend, self._lazy_refs)
+        cached = self._validator.cached(self._key)
+
+        if cached is not None:
+            logger.info(f'[INFO] {self._url} validated before, {"valid" if cached["valid"] else "invalid"}')
+
+            if not cached['valid']:
+                self.fail(ValidationError(cached['error']))
+            return
+
+        if self._validator.mode == 'parallel':
+            self._pending = _Background(self._parser)
+            return
+
+        try:
+            validate(self._parser)
+        except ValidationError as ex:
+            self._validator.store(self._key, str(ex))
+            self.fail(ex)
+            return
+
+        self._validator.store(self._key, None)
+
+    def check(self):
+        """ wait for the validation started in the background, raises or logs if the spec is invalid """
+        from prance import ValidationError
+
+        if self._pending is None:
+            return
+
+        error, cacheable = self._pending.result()
+        self._pending = None
+
+        if cacheable:
+            self._validator.store(self._key, error)
+
+        if error is not None:
+            self.fail(ValidationError(error))
+
+    def fail(self, ex):
+        if self._validator.mode == 'lenient':
+            logger.warning(f'[WARNING] {self._url} is not valid, scanned anyway: {ex}')
+            return
+
+        raise ex
+
+def resolve(parser, references=None):
+    """
+    resolve the $ref of parser.specification, what ResolvingParser._validate() does before
+    validating. external documents are taken from references (a ReferenceCache) if given
+    """
+    from prance.util.resolver import RefResolver
+
+    options = {name: value for name, value in parser.options.items() if name in RESOLVER_OPTIONS}
+
+    if references is not None:
+        options['reference_cache'] = references.scope(parser.url, options.get('strict', True))
+
+    resolver = RefResolver(parser.specification, parser.url, **options)
+    resolver.resolve_references(materialize=parser.options.get('materialize', False))
+    parser.specification = resolver.specs
+
+def validate(parser):
+    """ validate parser.specification as it is (resolved or not) with the backend of parser """
+    from prance import BaseParser
+    BaseParser._validate(parser)
+
+def _outcome(parser):
+    """ (error or None, whether the outcome may be cached) of validating parser """
+    from prance import ValidationError
+
+    try:
+        validate(parser)
+        return None, True
+    except ValidationError as ex:
+        return str(ex), True
+    except Exception as ex:
+        return f'{type(ex).__name__}: {ex}', False
+
+def _validate_child(parser, conn):
+    conn.send(_outcome(parser))
+    conn.close()
+
+class _Background():
+    """
+    _outcome(parser) in a forked process, which shares the spec with the building process
+    without copying it. in a thread where fork is not available
+    """
+    def __init__(self, parser):
+        import multiprocessing
+
+        self._process = None
+        self._thread = None
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            self._conn, child = context.Pipe(duplex=False)
+            self._process = context.Process(target=_validate_child, args=(parser, child), daemon=True)
+            self._process.start()
+            child.close()
+        else:
+            import threading
+
+            self._outcome = None
+            self._thread = threading.Thread(target=self.run, args=(parser,), daemon=True)
+            self._thread.start()
+
+    def run(self, parser):
+        self._outcome = _outcome(parser)
+
+    def result(self):
+        if self._thread:
+            self._thread.join()
+            return self._outcome
+
+        try:
+            outcome = self._conn.recv()
+        except EOFError:
+            outcome = (f'validation process ended with exit code {self._process.exitcode}', False)
+
+        self._conn.close()
+        self._process.join()
+        return outcome
@@ -0,0 +1,129 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+
+class DirectoryWatcher():
+    """
+    tells which spec files of a directory were added, changed or removed since the last call
+    of changes(). the spec files are the ones found by discovery (a SpecDiscovery, *.json of
+    dir by default), compared by (mtime, size, inode). wait() only decides when to look
+    again: on inotify events (linux, not for subdirectories) or every interval seconds otherwise
+    """
+    def __init__(self, dir, interval=2.0, discovery=None):
+        from parser.discovery import SpecDiscovery
+
+        self._dir = dir
+        self._interval = interval
+        self._discovery = discovery or SpecDiscovery(dir)
+        self._signatures = {}
+        # inotify only watches dir itself
+        self._inotify = None if self._discovery.recursive else _Inotify.open(dir)
+
+        if self._inotify:
+            logger.info(f'[INFO] watching {dir} with inotify')
+        else:
+            logger.info(f'[INFO] watching {dir} every {interval}s')
+
+    @property
+    def files(self):
+        """ the spec files as of the last changes(), sorted """
+        return sorted(self._signatures)
+
+    def signatures(self):
+        signatures = {}
+
+        for file in self._discovery.again():
+            try:
+                stat = os.stat(os.path.join(self._dir, file))
+            except FileNotFoundError:
+                continue
+
+            signatures[file] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        return signatures
+
+    def changes(self):
+        """ (added or changed, removed) files since the last call, the first call reports all files """
+        signatures = self.signatures()
+        changed = sorted(file for file, signature in signatures.items() if self._signatures.get(file) != signature)
+        removed = sorted(file for file in self._signatures if file not in signatures)
+        self._signatures = signatures
+        return changed, removed
+
+    def wait(self, settle=0.2):
+        """ block until the directory might have changed, then let writers settle """
+        import time
+
+        if not self._inotify:
+            time.sleep(self._interval)
+            return
+
+        self._inotify.wait(None)
+
+        # a copy or an editor save is several events, take them in one go
+        while self._inotify.wait(settle):
+            pass
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+
+class _Inotify():
+    def __init__(self, fd):
+        self._fd = fd
+
+    @staticmethod
+    def open(dir):
+        """ an inotify watch of dir, None where inotify is not available """
+        import ctypes
+        import ctypes.util
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError, TypeError):
+            return None
+
+        inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = inotify_init1(IN_CLOEXEC)
+
+        if fd < 0:
+            logger.warning(f'[WARNING] inotify not available: {os.strerror(ctypes.get_errno())}')
+            return None
+
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+        if inotify_add_watch(fd, os.fsencode(dir), mask) < 0:
+            logger.warning(f'[WARNING] inotify watch of {dir} failed: {os.strerror(ctypes.get_errno())}')
+            os.close(fd)
+            return None
+
+        return _Inotify(fd)
+
+    def wait(self, timeout):
+        """ True if events arrived within timeout (None: no limit), the events are drained """
+        import select
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+
+        if not ready:
+            return False
+
+        # which file changed is found by DirectoryWatcher.changes(), the events are only a wake up
+        os.read(self._fd, 1 << 16)
+        return True
+
+    def close(self):
+        os.close(self._fd)
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules of the scanner are imported from the repository root, as main.py does
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def specs(tmp_path):
+    """ an input dir with two synthetic specs, values with \\r\\n and \\r included """
+    from benchmarks.synthetic import SyntheticSpec
+
+    input = tmp_path / 'specs'
+    input.mkdir()
+
+    for name, seed in (('orders.json', 1), ('users.json', 2)):
+        spec = SyntheticSpec(schemas=20, properties=4, depth=2, allof=3, paths=8, seed=seed).spec()
+        spec['info']['description'] = 'first line\r\nsecond line'
+        spec['components']['schemas']['Schema0']['description'] = 'one\rtwo\nthree'
+
+        with open(input / name, 'w') as f:
+            json.dump(spec, f)
+
+    return input
+
+@pytest.fixture
+def scan(tmp_path):
+    """ run main.py on an input dir into a new output dir, which is returned """
+    runs = []
+
+    def run(input, *options):
+        output = tmp_path / f'out{len(runs)}'
+        output.mkdir()
+        runs.append(output)
+        subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), '--input', str(input), '--output', str(output), *options], cwd=ROOT, check=True, capture_output=True)
+        return output
+
+    return run
+
+def merged(output):
+    """ the bytes of objects.csv and links.csv of an output dir, taken from metadata.zip """
+    from zipfile import ZipFile
+
+    with ZipFile(output / 'metadata.zip') as metadata:
+        return metadata.read('objects.csv'), metadata.read('links.csv')
@@ -0,0 +1,12 @@
+def test_duplicates_dropped_on_read():
+    """ an edge stored again is read once, where it was stored first """
+    from model.associations import AssociationStore
+
+    store = AssociationStore(['parent'])
+
+    for fromidentity, toidentity in (('a', 'b'), ('b', 'a'), ('a', 'b'), ('c', 'a'), ('b', 'a'), ('a', 'c')):
+        store.add('parent', fromidentity, toidentity)
+
+    store.add('child', 'b', 'a')
+
+    assert list(store.rows()) == [('parent', 'a', 'b'), ('parent', 'b', 'a'), ('parent', 'c', 'a'), ('parent', 'a', 'c'), ('child', 'b', 'a')]
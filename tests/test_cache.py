@@ -0,0 +1,60 @@
+import json
+
+# a row only the cache has, to tell a hit from a scan
+MARK = 'taken,from,cache'
+
+def errors(description):
+    return {'Error': {'type': 'object', 'description': description, 'properties': {'code': {'type': 'integer'}}}}
+
+def spec(title):
+    return {
+        'openapi': '3.0.0',
+        'info': {'title': title, 'version': '1'},
+        'paths': {},
+        'components': {'schemas': {'Order': {'type': 'object', 'properties': {'error': {'$ref': 'common/errors.json#/Error'}}}}},
+    }
+
+def write(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f)
+
+def cached(output):
+    with open(output / 'objects.csv', encoding='UTF8', newline='') as f:
+        return MARK in f.read()
+
+def test_cache_hit_and_miss(scan, tmp_path):
+    """ an unchanged spec is taken from the cache, a change of it or of a document it refers to is scanned again """
+    input = tmp_path / 'specs'
+    (input / 'common').mkdir(parents=True)
+    write(input / 'api.json', spec('api'))
+    write(input / 'common' / 'errors.json', errors('first'))
+    cache = tmp_path / 'cache'
+
+    def mark():
+        for entry in cache.iterdir():
+            with open(entry / 'objects.csv', 'a', encoding='UTF8', newline='') as f:
+                f.write(MARK + '\r\n')
+
+    assert not cached(scan(input, '--cache', str(cache)))
+    mark()
+    assert cached(scan(input, '--cache', str(cache)))
+
+    write(input / 'common' / 'errors.json', errors('second'))
+    assert not cached(scan(input, '--cache', str(cache)))
+    mark()
+    assert cached(scan(input, '--cache', str(cache)))
+
+    write(input / 'api.json', spec('changed'))
+    assert not cached(scan(input, '--cache', str(cache)))
+
+def test_cache_not_used_with_debug(scan, tmp_path):
+    """ with --debug the spec is parsed, so its processed_ file is written """
+    input = tmp_path / 'specs'
+    (input / 'common').mkdir(parents=True)
+    write(input / 'api.json', spec('api'))
+    write(input / 'common' / 'errors.json', errors('first'))
+    cache = tmp_path / 'cache'
+    scan(input, '--cache', str(cache))
+
+    output = scan(input, '--cache', str(cache), '--debug', '1')
+    assert (output / 'processed_api.json').exists()
@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+def test_cycle_not_memoized_short():
+    """ in an allOf cycle A -> B -> A the map of B cut short at A is not kept, B composed later has the properties of A """
+    from model.composition import Composer
+
+    a = {'properties': {'a': {'type': 'string'}}}
+    b = {'allOf': [a], 'properties': {'b': {'type': 'string'}}}
+    # the cycle as the resolved specs of prance have it: the same objects
+    a['allOf'] = [b]
+    schema = SimpleNamespace(path='#/components/schemas/A')
+
+    composer = Composer()
+    assert set(composer.compose(a, schema)) == {'a', 'b'}
+    assert set(composer.compose(b, schema)) == {'a', 'b'}
+    assert set(composer.compose(a, schema)) == {'a', 'b'}
+    assert composer.stats['hits'] == 2
@@ -0,0 +1,38 @@
+import csv
+import json
+
+SCHEMAS = 'api.json/components/schemas/'
+
+def person(street):
+    return {'type': 'object', 'properties': {'name': {'type': 'string'}, 'address': {'type': 'object', 'properties': {'street': {'type': street}}}}}
+
+def schemaschema(output):
+    with open(output / 'links.csv', encoding='UTF8', newline='') as f:
+        return {(row['fromObjectIdentity'], row['toObjectIdentity']) for row in csv.DictReader(f) if row['association'] == 'com.informatica.ldm.openapi.schemaschema'}
+
+def identities(output):
+    with open(output / 'objects.csv', encoding='UTF8', newline='') as f:
+        return {row['identity'] for row in csv.DictReader(f)}
+
+def test_dedup_schemas(scan, tmp_path):
+    """ a schema equal to one walked before is linked to it, one differing in a nested property is walked """
+    input = tmp_path / 'specs'
+    input.mkdir()
+    spec = {
+        'openapi': '3.0.0',
+        'info': {'title': 'api', 'version': '1'},
+        'paths': {},
+        'components': {'schemas': {'Customer': person('string'), 'Supplier': person('string'), 'Employee': person('integer')}},
+    }
+
+    with open(input / 'api.json', 'w') as f:
+        json.dump(spec, f)
+
+    plain = scan(input)
+    output = scan(input, '--dedup-schemas')
+    links = schemaschema(output)
+
+    assert links - schemaschema(plain) == {(SCHEMAS + 'Supplier', SCHEMAS + 'Customer')}
+    assert identities(plain) - identities(output) == {SCHEMAS + 'Supplier/properties/name', SCHEMAS + 'Supplier/properties/address', SCHEMAS + 'Supplier/properties/address/properties/street'}
+    assert not any(SCHEMAS + 'Employee' in link and SCHEMAS + 'Customer' in link for link in links)
+    assert SCHEMAS + 'Employee/properties/address/properties/street' in identities(output)
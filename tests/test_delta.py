@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from zipfile import ZipFile
+
+def write(input, schemas):
+    spec = {'openapi': '3.0.0', 'info': {'title': 'api', 'version': '1'}, 'paths': {}, 'components': {'schemas': schemas}}
+
+    with open(input / 'api.json', 'w') as f:
+        json.dump(spec, f)
+
+def delta(output):
+    """ the rows of changes.csv and the identities of objects.csv in delta.zip """
+    with ZipFile(output / 'delta.zip') as zip:
+        changes = list(csv.DictReader(io.StringIO(zip.read('changes.csv').decode('UTF8'))))
+        objects = {row['identity'] for row in csv.DictReader(io.StringIO(zip.read('objects.csv').decode('UTF8')))}
+
+    return changes, objects
+
+def changed(changes, change, kind):
+    return {row['identity'] for row in changes if row['change'] == change and row['kind'] == kind}
+
+def test_delta(scan, tmp_path):
+    """ the first scan is added as a whole, the next one exports the added, changed and removed rows """
+    input = tmp_path / 'specs'
+    input.mkdir()
+    state = str(tmp_path / 'state.db')
+    schema = lambda description: {'type': 'object', 'description': description, 'properties': {'id': {'type': 'integer'}}}
+
+    write(input, {'Changed': schema('first'), 'Removed': schema('removed'), 'Kept': schema('kept')})
+    output = scan(input, '--delta', state)
+    changes, objects = delta(output)
+
+    with open(output / 'objects.csv', encoding='UTF8', newline='') as f:
+        identities = {row['identity'] for row in csv.DictReader(f)}
+
+    assert {row['change'] for row in changes} == {'added'}
+    assert changed(changes, 'added', 'object') == objects == identities
+
+    write(input, {'Changed': schema('second'), 'Kept': schema('kept'), 'Added': schema('added')})
+    changes, objects = delta(scan(input, '--delta', state))
+    schemas = 'api.json/components/schemas/'
+
+    assert changed(changes, 'changed', 'object') == {schemas + 'Changed'}
+    assert changed(changes, 'added', 'object') == {schemas + 'Added', schemas + 'Added/properties/id'}
+    assert changed(changes, 'removed', 'object') == {schemas + 'Removed', schemas + 'Removed/properties/id'}
+    assert schemas + 'Added' in changed(changes, 'added', 'link')
+    assert schemas + 'Removed' in changed(changes, 'removed', 'link')
+    assert changed(changes, 'changed', 'link') == set()
+    assert objects == {schemas + 'Changed', schemas + 'Added', schemas + 'Added/properties/id'}
+
+    changes, objects = delta(scan(input, '--delta', state))
+    assert changes == [] and objects == set()
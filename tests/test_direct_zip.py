@@ -0,0 +1,33 @@
+import pytest
+
+from conftest import merged
+
+@pytest.mark.parametrize('options', [['--direct-zip'], ['--direct-zip', '--workers', '2'], ['--direct-zip', '--zip-level', '1']])
+def test_same_as_merged_csv(specs, scan, options):
+    """ metadata.zip written straight from the rows holds the bytes of the merged csv files """
+    assert merged(scan(specs, *options)) == merged(scan(specs))
+
+def test_shards(specs, scan):
+    """ the shards hold all rows of the merged csv files, each shard with both headers """
+    import json
+    from zipfile import ZipFile
+
+    objects, links = merged(scan(specs))
+    output = scan(specs, '--direct-zip', '--shard-rows', '200')
+
+    with open(output / 'manifest.json') as f:
+        manifest = json.load(f)
+
+    assert len(manifest['shards']) > 1
+    object_rows = []
+    link_rows = []
+
+    for shard in manifest['shards']:
+        with ZipFile(output / shard['file']) as metadata:
+            object_header, *rows = metadata.read('objects.csv').splitlines(keepends=True)
+            object_rows += rows
+            link_header, *rows = metadata.read('links.csv').splitlines(keepends=True)
+            link_rows += rows
+
+    assert sorted([object_header] + object_rows) == sorted(objects.splitlines(keepends=True))
+    assert sorted([link_header] + link_rows) == sorted(links.splitlines(keepends=True))
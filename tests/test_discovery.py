@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+def tree(root, *files):
+    for file in files:
+        path = root / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('{}')
+
+def found(dir, **options):
+    from parser.discovery import SpecDiscovery
+
+    discovery = SpecDiscovery(str(dir), **options)
+    # as found while walking, and sorted once the walk is done
+    assert sorted(discovery.files()) == list(discovery)
+    return list(discovery)
+
+def test_recursive(tmp_path):
+    """ subdirectories are only scanned with recursive """
+    tree(tmp_path, 'a.json', 'b.yaml', 'orders/v1.json', 'orders/v2/spec.json')
+
+    assert found(tmp_path) == ['a.json']
+    assert found(tmp_path, recursive=True) == ['a.json', os.path.join('orders', 'v1.json'), os.path.join('orders', 'v2', 'spec.json')]
+    assert found(tmp_path, recursive=True, include=['*.yaml', 'orders/v2/*']) == ['b.yaml', os.path.join('orders', 'v2', 'spec.json')]
+
+def test_exclude(tmp_path):
+    """ exclude drops files by path or name, and directories without entering them """
+    tree(tmp_path, 'a.json', 'draft.json', 'orders/draft.json', 'orders/v1.json', 'legacy/old.json')
+
+    assert found(tmp_path, recursive=True, exclude=['draft.json', 'legacy']) == ['a.json', os.path.join('orders', 'v1.json')]
+    assert found(tmp_path, recursive=True, exclude=['orders/*']) == ['a.json', 'draft.json', os.path.join('legacy', 'old.json')]
+
+def test_symlink_loop(tmp_path):
+    """ symlinks leading back to a directory already walked are not followed again """
+    input = tmp_path / 'input'
+    outside = tmp_path / 'outside'
+    tree(input, 'a.json')
+    tree(outside, 'b.json')
+    (input / 'self').symlink_to(input)
+    (input / 'outside').symlink_to(outside)
+    (input / 'again').symlink_to(outside)
+    (outside / 'back').symlink_to(outside)
+    (outside / 'input').symlink_to(input)
+
+    assert found(input, recursive=True) == ['a.json']
+
+    specs = found(input, recursive=True, follow_symlinks=True)
+    assert specs[0] == 'a.json'
+    # the outside dir once, by one of the two symlinks to it
+    assert specs[1:] in ([os.path.join('again', 'b.json')], [os.path.join('outside', 'b.json')])
+
+def test_same_output_name(tmp_path):
+    """ orders/v1.json and orders__v1.json would overwrite each other's output """
+    from parser.discovery import SpecDiscovery
+
+    tree(tmp_path, 'orders__v1.json', 'orders/v1.json')
+
+    with pytest.raises(ValueError, match='orders__v1.json'):
+        list(SpecDiscovery(str(tmp_path), recursive=True))
+
+    assert found(tmp_path, recursive=True, exclude=['orders']) == ['orders__v1.json']
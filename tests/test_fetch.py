@@ -0,0 +1,104 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from parser.fetch import STATE_FILE, SpecFetcher
+
+# path -> (body, validator header) served by the stand-in
+DOCUMENTS = {
+    '/orders.json': (b'{"openapi": "3.0.3"}', ('ETag', '"v1"')),
+    '/users.json': (b'{"openapi": "3.0.3", "paths": {}}', ('Last-Modified', 'Sat, 17 Oct 2026 10:00:00 GMT'))
+}
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')))
+
+        if self.path not in DOCUMENTS:
+            self.send_error(404)
+            return
+
+        body, (header, value) = DOCUMENTS[self.path]
+
+        if self.headers.get('If-None-Match') == value or self.headers.get('If-Modified-Since') == value:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def urls(server, *paths):
+    return [f'http://127.0.0.1:{server.server_address[1]}{path}' for path in paths]
+
+def fetch(dir, urls):
+    fetcher = SpecFetcher(str(dir))
+
+    try:
+        return sorted(fetcher.fetch_all(urls)), fetcher.stats
+    finally:
+        fetcher.close()
+
+def test_download_and_not_modified(server, tmp_path):
+    specs = urls(server, '/orders.json', '/users.json')
+    names = SpecFetcher.names(specs)
+
+    fetched, stats = fetch(tmp_path, specs)
+
+    assert fetched == sorted(names.values())
+    assert stats == {'downloaded': 2, 'not_modified': 0, 'failed': 0}
+
+    for url, name in names.items():
+        assert (tmp_path / name).read_bytes() == DOCUMENTS[url[url.rindex('/'):]][0]
+
+    # a new run sends the validators kept in the state file back
+    fetched, stats = fetch(tmp_path, specs)
+
+    assert fetched == sorted(names.values())
+    assert stats == {'downloaded': 0, 'not_modified': 2, 'failed': 0}
+    assert sorted(server.requests[2:]) == [('/orders.json', '"v1"', None), ('/users.json', None, 'Sat, 17 Oct 2026 10:00:00 GMT')]
+
+def test_state_file(server, tmp_path):
+    specs = urls(server, '/orders.json', '/users.json')
+    names = SpecFetcher.names(specs)
+
+    fetch(tmp_path, specs)
+
+    with open(tmp_path / STATE_FILE) as f:
+        state = json.load(f)
+
+    orders, users = specs
+    assert state[names[orders]] == {'url': orders, 'etag': '"v1"', 'last_modified': None}
+    assert state[names[users]] == {'url': users, 'etag': None, 'last_modified': 'Sat, 17 Oct 2026 10:00:00 GMT'}
+
+def test_missing_spec_does_not_stop_the_others(server, tmp_path):
+    specs = urls(server, '/orders.json', '/missing.json', '/users.json')
+    names = SpecFetcher.names(specs)
+
+    fetched, stats = fetch(tmp_path, specs)
+
+    assert fetched == sorted(name for url, name in names.items() if 'missing' not in url)
+    assert stats == {'downloaded': 2, 'not_modified': 0, 'failed': 1}
+    assert not (tmp_path / names[specs[1]]).exists()
+
+    with open(tmp_path / STATE_FILE) as f:
+        assert names[specs[1]] not in json.load(f)
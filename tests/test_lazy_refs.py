@@ -0,0 +1,42 @@
+import csv
+import json
+
+def test_external_refs_not_linked(scan, tmp_path):
+    """ with --lazy-refs a $ref into another document is not linked, every link has its objects """
+    input = tmp_path / 'api'
+    (input / 'a').mkdir(parents=True)
+    (input / 'b').mkdir()
+
+    for dir in ('a', 'b'):
+        with open(input / dir / 'errors.json', 'w') as f:
+            json.dump({'Error': {'type': 'object', 'properties': {'code': {'type': 'integer'}}}}, f)
+
+    spec = {
+        'openapi': '3.0.0',
+        'info': {'title': 'api', 'version': '1'},
+        'paths': {},
+        'components': {'schemas': {
+            'Order': {'type': 'object', 'properties': {
+                'a': {'$ref': 'a/errors.json#/Error'},
+                'b': {'$ref': 'b/errors.json#/Error'},
+                'item': {'$ref': '#/components/schemas/Item'},
+            }},
+            'Item': {'type': 'object', 'properties': {'id': {'type': 'integer'}}},
+        }},
+    }
+
+    with open(input / 'api.json', 'w') as f:
+        json.dump(spec, f)
+
+    output = scan(input, '--lazy-refs', '--validation', 'skip')
+
+    with open(output / 'objects.csv', encoding='UTF8', newline='') as f:
+        identities = {row['identity'] for row in csv.DictReader(f)}
+
+    with open(output / 'links.csv', encoding='UTF8', newline='') as f:
+        links = [row for row in csv.DictReader(f) if row['association'] == 'com.informatica.ldm.openapi.schemaschema']
+
+    assert {(link['fromObjectIdentity'], link['toObjectIdentity']) for link in links} >= {
+        ('api.json/components/schemas/Order/properties/item', 'api.json/components/schemas/Item'),
+    }
+    assert all(link['toObjectIdentity'] in identities and link['fromObjectIdentity'] in identities for link in links)
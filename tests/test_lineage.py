@@ -0,0 +1,32 @@
+import json
+
+# Pet composes Animal through a $ref, the operations refer to a property of Animal and to Pet
+PETS = {
+    'openapi': '3.0.0',
+    'info': {'title': 'pets', 'version': '1'},
+    'paths': {
+        '/pets': {'get': {'responses': {'200': {'description': 'ok', 'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Animal/properties/id'}}}}}}},
+        '/owners': {'get': {'responses': {'200': {'description': 'ok', 'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Pet'}}}}}}},
+    },
+    'components': {'schemas': {
+        'Pet': {'allOf': [{'$ref': '#/components/schemas/Animal'}, {'properties': {'name': {'type': 'string'}}}]},
+        'Animal': {'properties': {'id': {'type': 'integer'}, 'kind': {'type': 'string'}}},
+    }},
+}
+
+def dataflow(output):
+    with open(output / 'links.csv', encoding='UTF8') as f:
+        return sorted(line for line in f if 'DataFlow' in line)
+
+def test_lineage_same_with_lazy_refs(specs, scan, tmp_path):
+    """ the dataflow links do not depend on whether prance resolved the $ref, also through allOf """
+    input = tmp_path / 'pets'
+    input.mkdir()
+
+    with open(input / 'pets.json', 'w') as f:
+        json.dump(PETS, f)
+
+    links = dataflow(scan(input))
+    assert 'core.DirectionalDataFlow,pets.json/paths//pets/get,pets.json/components/schemas/Animal/properties/id\n' in links
+    assert links == dataflow(scan(input, '--lazy-refs'))
+    assert dataflow(scan(specs)) == dataflow(scan(specs, '--lazy-refs'))
@@ -0,0 +1,48 @@
+import csv
+import io
+
+from conftest import merged
+
+def test_rows_as_written_by_dict_writer(specs, tmp_path):
+    """ the positional rows of objects.csv and links.csv are the bytes csv.DictWriter wrote of the object dicts """
+    from parser.openapi import OpenAPIParser
+    from parser.preprocessing import Preprocessor
+
+    dir = tmp_path / 'scan'
+    dir.mkdir()
+    spec = Preprocessor(str(specs / 'orders.json'), str(dir)).fix(True)
+    parser = OpenAPIParser('orders.json', spec, str(dir), url=str(specs / 'orders.json'))
+    parser.convert_objects()
+    parser.convert_links()
+
+    model = parser._model
+    objects = [model.endpoint, model.info, model.externalDocs] + model.schemas + model.properties + model.paths + model.operations
+    expected = io.StringIO(newline='')
+    writer = csv.DictWriter(expected, fieldnames=model.object_csv_header.keys())
+    writer.writeheader()
+    writer.writerows(o.build() for o in objects if o)
+
+    with open(dir / 'objects.csv', encoding='UTF8', newline='') as f:
+        assert f.read() == expected.getvalue()
+
+    expected = io.StringIO(newline='')
+    writer = csv.DictWriter(expected, fieldnames=model.link_csv_header.keys())
+    writer.writeheader()
+    writer.writerows(dict(zip(model.link_csv_header.keys(), row)) for row in model.associations.rows())
+
+    with open(dir / 'links.csv', encoding='UTF8', newline='') as f:
+        assert f.read() == expected.getvalue()
+
+def test_merged_output(specs, scan):
+    """ objects.csv and links.csv are the per-spec files one after the other, the header once """
+    output = scan(specs)
+
+    with open(output / 'objects.csv', 'rb') as f:
+        objects = f.read()
+
+    with open(output / 'links.csv', 'rb') as f:
+        links = f.read()
+
+    assert merged(output) == (objects, links)
+    assert b'\r' not in objects
+    assert objects.count(b'class,identity,') == 1
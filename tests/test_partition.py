@@ -0,0 +1,8 @@
+import pytest
+
+from conftest import merged
+
+@pytest.mark.parametrize('options', [[], ['--stream'], ['--lazy-refs'], ['--max-depth', '1'], ['--direct-zip']])
+def test_same_as_one_process(specs, scan, options):
+    """ a spec walked in batches by several processes gives the rows of a walk by one """
+    assert merged(scan(specs, '--spec-workers', '3', '--spec-batch', '4', *options)) == merged(scan(specs, *options))
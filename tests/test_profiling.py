@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_memory_per_stage(specs, scan, tmp_path, workers):
+    """ with --profile-memory the stages of the run report their peak memory, as the ones of every spec """
+    profile = tmp_path / 'profile'
+    scan(specs, '--profile', str(profile), '--profile-memory', '--workers', workers)
+
+    with open(profile / 'profile.json') as f:
+        report = json.load(f)
+
+    assert set(report['run']['stages']) >= {'discover', 'scan', 'merge', 'zip_metadata'}
+    assert all(stage['peak_bytes'] >= 0 for stage in report['run']['stages'].values())
+    assert sorted(report['specs']) == ['orders.json', 'users.json']
+    assert all('peak_bytes' in stage for spec in report['specs'].values() for stage in spec['stages'].values())
+    # the largest stage of a spec scanned in the run's process is within the run's scan stage
+    if workers == '1':
+        assert report['run']['stages']['scan']['peak_bytes'] >= max(stage['peak_bytes'] for spec in report['specs'].values() for stage in spec['stages'].values())
+
+    assert (profile / 'run.tracemalloc').exists()
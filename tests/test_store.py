@@ -0,0 +1,14 @@
+from conftest import merged
+
+def test_same_as_merged_csv(specs, scan, tmp_path):
+    """ the output rendered from the store is the output of a scan without it """
+    expected = merged(scan(specs))
+    store = str(tmp_path / 'store.db')
+    output = scan(specs, '--store', store)
+
+    with open(output / 'objects.csv', 'rb') as objects, open(output / 'links.csv', 'rb') as links:
+        assert (objects.read(), links.read()) == expected
+
+    assert merged(output) == expected
+    assert merged(scan(specs, '--store', store, '--from-store')) == expected
+    assert merged(scan(specs, '--store', store, '--from-store', '--direct-zip')) == expected
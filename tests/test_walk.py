@@ -0,0 +1,53 @@
+import sys
+
+DEEP = 'deep.json/components/schemas/Deep'
+
+def spec(depth):
+    """ a schema with depth nested object properties named child, the innermost with a leaf property """
+    value = {'type': 'object', 'properties': {'leaf': {'type': 'string'}}}
+
+    for _ in range(depth):
+        value = {'type': 'object', 'properties': {'child': value}}
+
+    return {'openapi': '3.0.0', 'info': {'title': 'deep', 'version': '1'}, 'paths': {}, 'components': {'schemas': {'Deep': value}}}
+
+def schemaschema(model):
+    return [row for row in model.associations.rows() if row[0] == 'com.informatica.ldm.openapi.schemaschema']
+
+def test_deeper_than_recursion_limit():
+    """ the walk does not recurse, a schema nested deeper than the recursion limit is walked to its leaf """
+    from model.model import OpenAPIModel
+
+    depth = sys.getrecursionlimit() + 500
+    model = OpenAPIModel()
+    model.build('deep.json', spec(depth))
+
+    assert len(model.schemas) == depth + 1
+    assert [p.id for p in model.properties] == [DEEP + '/properties/child' * depth + '/properties/leaf']
+    assert len(schemaschema(model)) == depth
+    assert model.truncated == []
+
+def test_truncated():
+    """ with max_depth or max_nodes the walk stops there and reports the schema cut """
+    from model.model import OpenAPIModel
+
+    model = OpenAPIModel(max_depth=10)
+    model.build('deep.json', spec(50))
+
+    assert len(model.schemas) == 11
+    assert model.properties == []
+    assert model.truncated == [(DEEP + '/properties/child' * 10, 'deeper than 10')]
+    assert len(schemaschema(model)) == 10
+
+    model = OpenAPIModel(max_nodes=20)
+    model.build('deep.json', spec(50))
+
+    assert len(model.schemas) == 20
+    assert model.truncated == [(DEEP, 'more than 20 nodes')]
+    # the schemas walked are still linked to their parents
+    assert len(schemaschema(model)) == 19
+
+    model = OpenAPIModel(max_depth=100, max_nodes=100)
+    model.build('deep.json', spec(50))
+    assert model.truncated == []
+    assert len(model.schemas) == 51 and len(model.properties) == 1
@@ -0,0 +1,21 @@
+from argparse import Namespace
+
+def length(args, spec_json, profiler):
+    return len(spec_json)
+
+def test_specs_in_flight_bounded(tmp_path):
+    """ run_specs submits the next specs as results are handed on, not all of them up front """
+    from main import SPECS_IN_FLIGHT, run_specs
+
+    args = Namespace(workers=2, output=str(tmp_path), profile=None, profile_memory=False, profile_cprofile=False)
+    taken = []
+
+    def spec_jsons():
+        for index in range(20):
+            taken.append(index)
+            yield 'x' * index
+
+    results = run_specs(args, length, spec_jsons())
+    assert next(results) == ('', 0)
+    assert len(taken) == SPECS_IN_FLIGHT * args.workers
+    assert list(results) == [('x' * index, index) for index in range(1, 20)]